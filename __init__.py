@@ -10,12 +10,8 @@ import math
 import os
 import struct
 
-from .readers import Reader
-from .bpy_util_funcs import *
-from .srm_parser import *
-from .trm_parser import *
-from .model_importer import *
-from .model_exporter import *
+# The parsers, importer and exporter are only imported when an operator runs,
+# so enabling the add-on doesn't have to load them (or NumPy) up front.
 
 from bpy_extras.io_utils import ImportHelper
 from bpy.props import StringProperty, BoolProperty, EnumProperty
@@ -128,8 +124,15 @@ class ImportSRRMesh(Operator, ImportHelper):
         default=True,
     ) # type: ignore
 
+    optimize_vertex_cache: BoolProperty(
+        name="Optimize Vertex Cache",
+        description="Reorder the model's triangles so they render faster in the viewport. Takes a little longer to import.",
+        default=False,
+    ) # type: ignore
+
     def execute(self, context):
-        return import_sr_model(self.filepath, self.custom_normals, self.assign_material_colors, self.import_textures)
+        from .model_importer import import_sr_model
+        return import_sr_model(self.filepath, self.custom_normals, self.assign_material_colors, self.import_textures, self.optimize_vertex_cache)
 
 # -------------------------------------------------------------------------
 
@@ -164,8 +167,15 @@ class ImportTRRMesh(Operator, ImportHelper):
         default=True,
     ) # type: ignore
 
+    optimize_vertex_cache: BoolProperty(
+        name="Optimize Vertex Cache",
+        description="Reorder the model's triangles so they render faster in the viewport. Takes a little longer to import.",
+        default=False,
+    ) # type: ignore
+
     def execute(self, context):
-       return import_tr_model(self.filepath, self.custom_normals, self.assign_material_colors, self.import_textures)
+       from .model_importer import import_tr_model
+       return import_tr_model(self.filepath, self.custom_normals, self.assign_material_colors, self.import_textures, self.optimize_vertex_cache)
 
 # --------------------------------------------------------------------------------------------------------
 
@@ -198,6 +208,7 @@ class ExportSRRMesh(Operator, ImportHelper):
     ) # type: ignore
 
     def execute(self, context):
+        from .model_exporter import export_sr_model
         return export_sr_model(self.filepath, self.version)
 
 # -------------------------------------------------------------------------
@@ -233,6 +244,7 @@ class ExportTRRMesh(Operator, ImportHelper):
     ) # type: ignore
 
     def execute(self, context):
+        from .model_exporter import export_tr_model
         return export_tr_model(self.filepath, self.version)
 
 # --------------------------------------------------------------------------------------------------------
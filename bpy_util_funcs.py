@@ -10,7 +10,9 @@ Module with various utility scripts for the Blender Python (`bpy`) module to all
 """
 
 import bpy, random, struct, os
+import numpy as np
 from typing import cast
+from concurrent.futures import ThreadPoolExecutor
 
 # ------------------------
 
@@ -81,6 +83,59 @@ def linear_to_srgb(value: float) -> float:
     else:
         return 1.055 * pow(value, 1.0 / 2.4) - 0.055
 
+# --------------------------------------------
+
+# -------------------------------------------------
+# BATCH DATA CONVERSIONS
+# Same as above, but for a whole stream at once!
+# Plain NumPy, the parsers decode with their own
+# Numba kernels instead when Numba is installed.
+# -------------------------------------------------
+
+# Convert a whole (N, 2) array of raw UV bytes at once
+def convert_uvs_batch(uvs: np.ndarray) -> np.ndarray:
+    """Takes an (N, 2) array of raw UV bytes, divides them by 255 and inverts the V component for the whole stream in one go."""
+    uvs_conv = uvs.astype(np.float32) * (1 / 255)
+    uvs_conv[:, 1] = 1 - uvs_conv[:, 1]
+
+    return uvs_conv
+
+# Convert a whole (N, 3) array of raw normal bytes at once
+def convert_vertex_normals_batch(normals: np.ndarray) -> np.ndarray:
+    """Takes an (N, 3) array of raw normal bytes and subtracts them by 127, same as `convert_vertex_normal` but for the whole stream in one go."""
+    # Subtract in place so the whole stream is converted with one float32 allocation
+    normals_conv = normals.astype(np.float32)
+    normals_conv -= 127
+
+    return normals_conv
+
+# --------------------------------------------
+
+# --------
+# STRINGS
+# --------
+
+# Every non-printable ASCII character (control characters and DEL)
+ASCII_NON_PRINTABLE = bytes(range(32)) + b"\x7f"
+
+# Translation table that deletes every non-printable character, filled in as new characters show up
+class NonPrintableTable(dict):
+    """`str.translate()` table that deletes non-printable characters. Characters are only checked the first time they're seen."""
+    def __missing__(self, code_point: int) -> int | None:
+        value = code_point if chr(code_point).isprintable() else None
+        self[code_point] = value
+        return value
+
+NON_PRINTABLE_TABLE = NonPrintableTable()
+
+# Remove every non-printable character from a name
+def sanitize_name(name: str) -> str:
+    """Remove every non-printable character from a name, without going through it in Python character by character."""
+    if name.isascii():  # Names are almost always plain ASCII, so filter their bytes instead
+        return name.encode("ascii").translate(None, ASCII_NON_PRINTABLE).decode("ascii")
+
+    return name.translate(NON_PRINTABLE_TABLE)
+
 # -------------------------------------------------------------------------------------------------------------------------------------------------
 
 # ----------
@@ -109,41 +164,137 @@ def add_material(mat: bpy.types.Material, model_obj: bpy.types.Object) -> int:
         model_data.materials.append(mat)
         return len(model_data.materials) - 1
 
+# Swap a material for a copy of a template material
+def apply_material_template(obj: bpy.types.Object, slot: int, template: bpy.types.Material) -> bpy.types.Material:
+    """Swap the material in one of the object's slots for a copy of a template material, keeping the original's name and viewport color. Anything else using the original, like a model imported earlier, gets the copy too."""
+    old_mat = obj.data.materials[slot]
+    new_mat = template.copy()
+    new_mat.diffuse_color = old_mat.diffuse_color
+
+    # Replace the old material everywhere it's used and free its name up for the copy, so a material that's already in use is rebuilt instead of duplicated
+    mat_name = old_mat.name
+    old_mat.user_remap(new_mat)
+    bpy.data.materials.remove(old_mat)
+    new_mat.name = mat_name
+
+    return new_mat
+
 # ---------------------------------------------------------------------------------------------
 
 # Add weights to a model
-def add_model_weights(obj: bpy.types.Object, bone_indices: list[list[int]], bone_weights: list[list[int]]):
+def add_model_weights(obj: bpy.types.Object, bone_indices: np.ndarray | list[list[int]], bone_weights: np.ndarray | list[list[int]]):
     """Add vertex group weights to the object."""
     print("Adding vertex weights...")
     vertex_groups = {}
 
-    # Loop through vertices and assign weights
-    for vertex_index, (vertex_bone_ids, vertex_bone_weights) in enumerate(zip(bone_indices, bone_weights)):
-        for bone_index, weight in zip(vertex_bone_ids, vertex_bone_weights):
-            # Ignore zero weights
-            if weight == 0:
-                continue
+    bone_indices = np.asarray(bone_indices, dtype=np.int32)
+    bone_weights = np.asarray(bone_weights, dtype=np.int32)
+    if bone_indices.size == 0:
+        return
+
+    # Flatten every vertex's influences, ignoring zero weights
+    non_zero = bone_weights != 0
+    vertex_ids = np.nonzero(non_zero)[0]
+    bones = bone_indices[non_zero]
+    weights = bone_weights[non_zero]
+
+    # A vertex may list the same bone more than once; each add replaces the last one, so only its last slot counts
+    pairs = vertex_ids * 256 + bones
+    _, last_from_end = np.unique(pairs[::-1], return_index=True)
+    last_slots = np.sort(len(pairs) - 1 - last_from_end)
+
+    # Create the vertex groups in the order their bones first show up
+    _, first_slots = np.unique(bones, return_index=True)
+    for bone_index in bones[np.sort(first_slots)].tolist():
+        group_name = f"bone_{bone_index}"
+        vertex_groups[group_name] = obj.vertex_groups.new(name=group_name)
 
-            group_name = f"bone_{bone_index}"
+    vertex_ids = vertex_ids[last_slots]
+    bones = bones[last_slots]
+    weights = weights[last_slots]
 
-            # Create the vertex group if it doesn't exist
-            if group_name not in vertex_groups:
-                vertex_groups[group_name] = obj.vertex_groups.new(name=group_name)
+    # Bucket the influences by (bone, weight) so each bucket only needs a single call to add
+    keys = bones * 256 + weights
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    vertex_ids = vertex_ids[order]
+    bucket_keys, bucket_starts = np.unique(keys, return_index=True)
 
-            # Normalize weight
-            normalized_weight = weight / 255.0
-            vertex_groups[group_name].add([vertex_index], normalized_weight, 'REPLACE')
+    for key, bucket_vertices in zip(bucket_keys, np.split(vertex_ids, bucket_starts[1:])):
+        bone_index, weight = divmod(int(key), 256)
+        # Normalize weight
+        normalized_weight = weight / 255.0
+        vertex_groups[f"bone_{bone_index}"].add(bucket_vertices.tolist(), normalized_weight, 'REPLACE')
 
 # ---------------------------------------------------------------------------------------------
 
+# DDS flags we want our textures to have: DDSD_CAPS | DDSD_HEIGHT | DDSD_WIDTH | DDSD_PIXELFORMAT | DDSD_MIPMAPCOUNT | DDSD_LINEARSIZE
+DDS_PATCHED_FLAGS = struct.pack("<I", 659463)
+
+# DDS files we've already patched during the current import, so they're never reopened. The importers clear this before every import
+patched_dds_paths: set[str] = set()
+
 # Patch DDS flags so it has DDSD_CAPS and the user won't have to go through extra hoops to get them to work on Blender directly
 def patch_dds_flags(path):
+    if path in patched_dds_paths:
+        return
+
     try:
-        with open(path, "r+b") as f:
+        # Unbuffered, we only ever touch 4 bytes
+        with open(path, "r+b", buffering=0) as f:
             f.seek(8)  # Flags' offset
-            f.write(struct.pack("<I", 659463))  # DDSD_CAPS | DDSD_HEIGHT | DDSD_WIDTH | DDSD_PIXELFORMAT | DDSD_MIPMAPCOUNT | DDSD_LINEARSIZE
-        print(f"Patched DDS flags for: {os.path.basename(path)}")
+            if f.read(4) != DDS_PATCHED_FLAGS:
+                f.seek(8)
+                f.write(DDS_PATCHED_FLAGS)
+                print(f"Patched DDS flags for: {os.path.basename(path)}")
+        patched_dds_paths.add(path)
     except Exception as e:
         print(f"Failed to patch DDS: {path} ({e})")
 
-# --------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+# List the texture directory once so we don't have to ask the disk about every texture we look for
+def scan_texture_directory(tex_dir: str) -> dict[str, str]:
+    """List the files in the texture directory once. Returns a dictionary of upper-case file names to their real file names."""
+    if not os.path.isdir(tex_dir):
+        return {}
+
+    with os.scandir(tex_dir) as entries:
+        return {entry.name.upper(): entry.name for entry in entries if entry.is_file()}
+
+# Patch the DDS flags of a bunch of files in parallel
+def patch_dds_files(paths: list[str]) -> None:
+    """Patch the DDS flags of many files at once. This only touches the files on disk (unlike loading them into Blender), so it's safe to do off the main thread."""
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        executor.map(patch_dds_flags, set(paths))
+
+# Find every texture file that exists for the given names
+def find_texture_paths(tex_dir: str, tex_files: dict[str, str], base_names, suffixes: tuple[str, ...]) -> list[str]:
+    """Get the path of every texture file in the texture directory that exists for the given base names and suffixes."""
+    paths = []
+    for base_name in base_names:
+        for suffix in suffixes:
+            tex_file = tex_files.get((base_name + suffix).upper())
+            if tex_file:
+                paths.append(os.path.join(tex_dir, tex_file))
+
+    return paths
+
+# Load a DDS texture, reusing it if another material already loaded it for the same kind of map
+def load_dds_image(path: str, image_cache: dict[tuple[str, bool], bpy.types.Image], non_color: bool = False) -> bpy.types.Image:
+    """Patch and load a DDS texture into Blender, reusing the image if it was already loaded as the same kind of map. Normal and specular maps pass `non_color`, which loads them as Non-Color data."""
+    image = image_cache.get((path, non_color))
+    if image is None:
+        patch_dds_flags(path)
+        image = bpy.data.images.load(path, check_existing=True)
+
+        # Images are shared, so changing the color space of one that's already used as the other kind of map would change it for every material using it. Load a separate copy instead
+        # (a freshly loaded image isn't used by anything yet, so a normal or specular map can just switch it to Non-Color)
+        if (image.colorspace_settings.name == 'Non-Color') != non_color and (image.users or not non_color):
+            image = bpy.data.images.load(path, check_existing=False)
+
+        if non_color:
+            image.colorspace_settings.name = 'Non-Color'
+        image_cache[(path, non_color)] = image
+
+    return image
+
+# --------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
\ No newline at end of file
@@ -0,0 +1,55 @@
+# ----------------------------------------
+#   JIT KERNELS
+#       Numeric kernels for the importer's
+#       hot paths, compiled with Numba
+#       when it happens to be installed!
+# ----------------------------------------
+"""
+Numeric kernels for the importer's hot paths, compiled with Numba when it happens to be installed.
+
+Blender doesn't ship Numba, so check `HAS_NUMBA` before calling anything in here and fall back to plain NumPy when it's `False`.
+These kernels only ever see plain arrays, they must never call back into `bpy`.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+HAS_NUMBA: bool = njit is not None
+""" Is Numba installed in Blender's Python? """
+
+# ------------------------
+
+if HAS_NUMBA:
+    # Decode the byte fields of a whole SRM vertex block in a single pass
+    @njit(parallel=True, cache=True)
+    def decode_srm_vertex_bytes(raw: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Takes an (N, 32) uint8 view of the SRM vertex block and returns its tangents, normals and UVs already converted, in one loop over the vertices."""
+        count = raw.shape[0]
+        tangents = np.empty((count, 3), dtype=np.float32)
+        normals = np.empty((count, 3), dtype=np.float32)
+        uvs = np.empty((count, 2), dtype=np.float32)
+        for i in prange(count):
+            for j in range(3):
+                tangents[i, j] = np.float32(raw[i, 12 + j]) - 127.0
+                normals[i, j] = np.float32(raw[i, 16 + j]) - 127.0
+            uvs[i, 0] = np.float32(raw[i, 23]) / 255.0
+            uvs[i, 1] = 1.0 - np.float32(raw[i, 27]) / 255.0
+        return tangents, normals, uvs
+
+    # Decode the byte fields of a whole TRM vertex block in a single pass
+    @njit(parallel=True, cache=True)
+    def decode_trm_vertex_bytes(raw: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Takes an (N, 24) uint8 view of the TRM vertex block and returns its normals and UVs already converted, in one loop over the vertices."""
+        count = raw.shape[0]
+        normals = np.empty((count, 3), dtype=np.float32)
+        uvs = np.empty((count, 2), dtype=np.float32)
+        for i in prange(count):
+            for j in range(3):
+                normals[i, j] = np.float32(raw[i, 12 + j]) - 127.0
+            uvs[i, 0] = np.float32(raw[i, 19]) / 255.0
+            uvs[i, 1] = 1.0 - np.float32(raw[i, 23]) / 255.0
+        return normals, uvs
@@ -10,11 +10,13 @@ Takes the parsed model data and builds it into Blender's scene as objects.
 import os
 import bpy
 import math
+import numpy as np
 
 from .srm_parser import *
 from .trm_parser import *
 
 from .bpy_util_funcs import *
+from .vertex_cache_optimizer import optimize_vertex_cache
 
 from itertools import chain
 from collections import defaultdict
@@ -27,10 +29,13 @@ from collections import defaultdict
 # ==================
 
 # Import a Soul Reaver model!
-def import_sr_model(file_path: str, use_custom_normals: bool = False, assign_material_colors: bool = True, import_textures: bool = True):
+def import_sr_model(file_path: str, use_custom_normals: bool = False, assign_material_colors: bool = True, import_textures: bool = True, optimize_for_gpu: bool = False):
     """Import an SRM model and construct it in Blender."""
     print(f"\nIMPORTING SRM MODEL: {file_path}...\n")
 
+    # Files may have been replaced on disk since the last import, so check every DDS file again
+    patched_dds_paths.clear()
+
     # Load model using SRM parser
     model = SRM(file_path)
 
@@ -51,88 +56,139 @@ def import_sr_model(file_path: str, use_custom_normals: bool = False, assign_mat
     mesh_name = os.path.splitext(os.path.basename(file_path))[0]
     mesh = bpy.data.meshes.new(name=mesh_name)
     obj = bpy.data.objects.new(mesh_name, mesh)
-    bpy.context.scene.collection.objects.link(obj)
     # obj.scale = (0.10, 0.10, 0.10)
 
+    # Sanitize the texture names once, they're shared by the materials and the textures
+    material_names = [sanitize_name(texture_name) for texture_name in model_data["textures"]]
+
     # Build the mesh (vertices, faces, normals, UVs, etc.)
-    build_mesh_from_data(mesh, obj, model_data, use_custom_normals, assign_material_colors)
+    material_slots = build_mesh_from_data(mesh, obj, model_data, material_names, use_custom_normals, assign_material_colors, optimize_for_gpu)
 
     # Add textures to the materials
     texture_directory = os.path.join(os.path.dirname(os.path.dirname(file_path)), 'TEX')
 
     if import_textures and "textures" in model_data:
-        for i, texture_name in enumerate(model_data["textures"]):
-            sanitized_name = ''.join(c for c in texture_name if c.isprintable())
-            mat = obj.data.materials[i]
-            import_sr_textures(mat, texture_directory, sanitized_name)
+        texture_files = scan_texture_directory(texture_directory)
+        image_cache = {}
+
+        # Patch every DDS file this model uses in parallel first, loading them into Blender has to stay on the main thread
+        patch_dds_files(find_texture_paths(texture_directory, texture_files, material_slots, ("_D.DDS", "_N.DDS", "_S.DDS")))
+
+        template = create_sr_template_material()
+
+        uses_normal_maps = False
+        try:
+            for sanitized_name, slot in material_slots.items():
+                mat = apply_material_template(obj, slot, template)
+                uses_normal_maps |= import_sr_textures(mat, texture_directory, sanitized_name, texture_files, image_cache)
+        finally:
+            # Don't leave the template behind, even if a material failed
+            bpy.data.materials.remove(template)
+
+        # Tangents are only needed by the normal maps, so only calculate them once if any material uses one
+        if uses_normal_maps:
+            mesh.calc_tangents()
+
+    # Only link the object to the scene once it's fully built, so building it doesn't keep tagging the scene for updates
+    bpy.context.scene.collection.objects.link(obj)
 
     print("\nMODEL IMPORT COMPLETE!")
     return {'FINISHED'}
 
-# Import (a) Soul Reaver texture(s)!
-def import_sr_textures(mat: bpy.types.Material, tex_dir: str, base_name: str):
+# Build the shader every Soul Reaver material starts from!
+def create_sr_template_material() -> bpy.types.Material:
+    """Build the node graph that every textured Soul Reaver material is copied from, so each material is one copy rather than a pile of node and link creations."""
+    mat = bpy.data.materials.new("SRM_Template")
     mat.use_nodes = True
+    nodes = mat.node_tree.nodes
+    links = mat.node_tree.links
+    nodes.clear()
+
+    # Principled BSDF
+    bsdf = nodes.new("ShaderNodeBsdfPrincipled")
+    output = nodes.new("ShaderNodeOutputMaterial")
+    links.new(output.inputs['Surface'], bsdf.outputs['BSDF'])
+
+    # Diffuse Map
+    tex_d = nodes.new("ShaderNodeTexImage")
+    tex_d.name = "DiffuseTex"
+    links.new(bsdf.inputs['Base Color'], tex_d.outputs['Color'])
+    links.new(bsdf.inputs['Alpha'], tex_d.outputs['Alpha'])
+
+    # Normal Map
+    tex_n = nodes.new("ShaderNodeTexImage")
+    tex_n.name = "NormalTex"
+    # TODO: Rebuild the Z axis
+    normal_map = nodes.new("ShaderNodeNormalMap")
+    normal_map.name = "NormalMap"
+    links.new(normal_map.inputs['Color'], tex_n.outputs['Color'])
+    links.new(bsdf.inputs['Normal'], normal_map.outputs['Normal'])
+
+    # Specular Map
+    tex_s = nodes.new("ShaderNodeTexImage")
+    tex_s.name = "SpecularTex"
+    if is_blender_4():  # Handle Blender 4.0+ specular inputs
+        links.new(bsdf.inputs['Specular Tint'], tex_s.outputs['Color'])
+        # links.new(bsdf.inputs['IOR'], tex_s.outputs['Alpha']) # Connect the alpha properly to Specular IOR Level
+    else:
+        links.new(bsdf.inputs['Specular'], tex_s.outputs['Color'])
+        links.new(bsdf.inputs['Specular Tint'], tex_s.outputs['Alpha'])
 
-    for node in mat.node_tree.nodes:
-        mat.node_tree.nodes.remove(node)
+    return mat
 
-   # Add Principled BSDF if it doesn't exist
-    bsdf = mat.node_tree.nodes.new("ShaderNodeBsdfPrincipled")
-    output = mat.node_tree.nodes.new("ShaderNodeOutputMaterial")
-    mat.node_tree.links.new(output.inputs['Surface'], bsdf.outputs['BSDF'])
+# Import (a) Soul Reaver texture(s)!
+def import_sr_textures(mat: bpy.types.Material, tex_dir: str, base_name: str, tex_files: dict[str, str], image_cache: dict[tuple[str, bool], bpy.types.Image]) -> bool:
+    """Fill in the textures of a material copied from the Soul Reaver template, removing the nodes of any texture we can't find. Returns `True` if a normal map was linked."""
+    nodes = mat.node_tree.nodes
+    has_normal_map = False
 
    # Diffuse Map
-    d_path = os.path.join(tex_dir, base_name + "_D.DDS")
-    if os.path.exists(d_path):
+    d_file = tex_files.get((base_name + "_D.DDS").upper())
+    if d_file:
+        d_path = os.path.join(tex_dir, d_file)
         print(f"Diffuse texture found: {d_path}")
-        patch_dds_flags(d_path)
-        tex_d = mat.node_tree.nodes.new("ShaderNodeTexImage")
-        tex_d.image = bpy.data.images.load(d_path)
-        mat.node_tree.links.new(bsdf.inputs['Base Color'], tex_d.outputs['Color'])
-        mat.node_tree.links.new(bsdf.inputs['Alpha'], tex_d.outputs['Alpha'])
+        nodes["DiffuseTex"].image = load_dds_image(d_path, image_cache)
     else:
         print(f"Diffuse texture not found for {base_name}")
+        nodes.remove(nodes["DiffuseTex"])
 
     # Normal Map
-    n_path = os.path.join(tex_dir, base_name + "_N.DDS")
-    if os.path.exists(n_path):
+    n_file = tex_files.get((base_name + "_N.DDS").upper())
+    if n_file:
+        n_path = os.path.join(tex_dir, n_file)
         print(f"Normal texture found: {n_path}")
-        patch_dds_flags(n_path)
-        tex_n = mat.node_tree.nodes.new("ShaderNodeTexImage")
-        tex_n.image = bpy.data.images.load(n_path)
-        tex_n.image.colorspace_settings.name = 'Non-Color'
-        # TODO: Rebuild the Z axis
-        normal_map = mat.node_tree.nodes.new("ShaderNodeNormalMap")
-        mat.node_tree.links.new(normal_map.inputs['Color'], tex_n.outputs['Color'])
-        mat.node_tree.links.new(bsdf.inputs['Normal'], normal_map.outputs['Normal'])
+        tex_n = nodes["NormalTex"]
+        tex_n.image = load_dds_image(n_path, image_cache, non_color=True)
+        has_normal_map = True
     else:
         print(f"Normal texture not found for {base_name}")
+        nodes.remove(nodes["NormalTex"])
+        nodes.remove(nodes["NormalMap"])
 
     # Specular Map
-    s_path = os.path.join(tex_dir, base_name + "_S.DDS")
-    if os.path.exists(s_path):
+    s_file = tex_files.get((base_name + "_S.DDS").upper())
+    if s_file:
+        s_path = os.path.join(tex_dir, s_file)
         print(f"Specular texture found: {s_path}")
-        patch_dds_flags(s_path)
-        tex_s = mat.node_tree.nodes.new("ShaderNodeTexImage")
-        tex_s.image = bpy.data.images.load(s_path)
-        tex_s.image.colorspace_settings.name = 'Non-Color'
-
-        if is_blender_4():  # Handle Blender 4.0+ specular inputs
-            mat.node_tree.links.new(bsdf.inputs['Specular Tint'], tex_s.outputs['Color'])
-            # mat.node_tree.links.new(bsdf.inputs['IOR'], tex_s.outputs['Alpha']) # Connect the alpha properly to Specular IOR Level
-        else:
-            mat.node_tree.links.new(bsdf.inputs['Specular'], tex_s.outputs['Color'])
-            mat.node_tree.links.new(bsdf.inputs['Specular Tint'], tex_s.outputs['Alpha'])
+        tex_s = nodes["SpecularTex"]
+        tex_s.image = load_dds_image(s_path, image_cache, non_color=True)
+    else:
+        nodes.remove(nodes["SpecularTex"])
+
+    return has_normal_map
 
 # ==================
 # TOMB RAIDER STUFF
 # ==================
 
 # Import a Tomb Raider model!
-def import_tr_model(file_path: str, use_custom_normals: bool = False, assign_material_colors: bool = True, import_textures: bool = True):
+def import_tr_model(file_path: str, use_custom_normals: bool = False, assign_material_colors: bool = True, import_textures: bool = True, optimize_for_gpu: bool = False):
     """Import a TRM model and construct it in Blender."""
     print(f"\nIMPORTING TRM MODEL: {file_path}...\n")
 
+    # Files may have been replaced on disk since the last import, so check every DDS file again
+    patched_dds_paths.clear()
+
     # Load model using TRM parser
     model = TRM(file_path)
 
@@ -153,95 +209,152 @@ def import_tr_model(file_path: str, use_custom_normals: bool = False, assign_mat
     mesh_name = os.path.splitext(os.path.basename(file_path))[0]
     mesh = bpy.data.meshes.new(name=mesh_name)
     obj = bpy.data.objects.new(mesh_name, mesh)
-    bpy.context.scene.collection.objects.link(obj)
     # obj.rotation_euler[0] += math.radians(-90)
     # obj.scale = (0.10, 0.10, 0.10)
 
+    # Sanitize the texture names once, they're shared by the materials and the textures
+    material_names = [sanitize_name(texture_name) for texture_name in model_data["textures"]]
+
     # Build the mesh (vertices, faces, normals, UVs, etc.)
-    build_mesh_from_data(mesh, obj, model_data, use_custom_normals, assign_material_colors)
+    material_slots = build_mesh_from_data(mesh, obj, model_data, material_names, use_custom_normals, assign_material_colors, optimize_for_gpu)
 
     # Add textures to the materials
     texture_directory = os.path.join(os.path.dirname(os.path.dirname(file_path)), 'TEX')
 
     if import_textures and "textures" in model_data:
-        for i, texture_name in enumerate(model_data["textures"]):
-            sanitized_name = ''.join(c for c in texture_name if c.isprintable())
-            mat = obj.data.materials[i]
-            import_tr_textures(mat, texture_directory, sanitized_name)
+        texture_files = scan_texture_directory(texture_directory)
+        image_cache = {}
+
+        # Patch every DDS file this model uses in parallel first, loading them into Blender has to stay on the main thread
+        patch_dds_files(find_texture_paths(texture_directory, texture_files, material_slots, (".DDS",)))
+
+        template = create_tr_template_material()
+
+        try:
+            for sanitized_name, slot in material_slots.items():
+                mat = apply_material_template(obj, slot, template)
+                import_tr_textures(mat, texture_directory, sanitized_name, texture_files, image_cache)
+        finally:
+            # Don't leave the template behind, even if a material failed
+            bpy.data.materials.remove(template)
+
+    # Only link the object to the scene once it's fully built, so building it doesn't keep tagging the scene for updates
+    bpy.context.scene.collection.objects.link(obj)
 
     print("\nMODEL IMPORT COMPLETE!")
     return {'FINISHED'}
 
-# Import (a) Tomb Raider texture(s)!
-def import_tr_textures(mat: bpy.types.Material, tex_dir: str, base_name: str):
+# Build the shader every Tomb Raider material starts from!
+def create_tr_template_material() -> bpy.types.Material:
+    """Build the node graph that every textured Tomb Raider material is copied from, so each material is one copy rather than a pile of node and link creations."""
+    mat = bpy.data.materials.new("TRM_Template")
     mat.use_nodes = True
+    nodes = mat.node_tree.nodes
+    links = mat.node_tree.links
+    nodes.clear()
 
-    # Remove Principled BSDF
-    for node in mat.node_tree.nodes:
-        mat.node_tree.nodes.remove(node)
+    # Diffuse BSDF
+    diffuse_bsdf = nodes.new("ShaderNodeBsdfDiffuse")
+    output = nodes.new("ShaderNodeOutputMaterial")
+    links.new(output.inputs['Surface'], diffuse_bsdf.outputs['BSDF'])
 
-    # Add Diffuse BSDF
-    diffuse_bsdf = mat.node_tree.nodes.new("ShaderNodeBsdfDiffuse")
-    output = mat.node_tree.nodes.new("ShaderNodeOutputMaterial")
-    mat.node_tree.links.new(output.inputs['Surface'], diffuse_bsdf.outputs['BSDF'])
+    # Diffuse Map
+    tex_image = nodes.new("ShaderNodeTexImage")
+    tex_image.name = "DiffuseTex"
+    links.new(diffuse_bsdf.inputs['Color'], tex_image.outputs['Color'])
+
+    return mat
+
+# Import (a) Tomb Raider texture(s)!
+def import_tr_textures(mat: bpy.types.Material, tex_dir: str, base_name: str, tex_files: dict[str, str], image_cache: dict[tuple[str, bool], bpy.types.Image]):
+    """Fill in the texture of a material copied from the Tomb Raider template, removing its node if we can't find it."""
+    nodes = mat.node_tree.nodes
 
     # Diffuse Map
-    tex_path = os.path.join(tex_dir, base_name + ".DDS")
-    if os.path.exists(tex_path):
+    tex_file = tex_files.get((base_name + ".DDS").upper())
+    if tex_file:
+        tex_path = os.path.join(tex_dir, tex_file)
         print(f"Texture found: {tex_path}")
-        patch_dds_flags(tex_path)
-        tex_image = mat.node_tree.nodes.new("ShaderNodeTexImage")
-        tex_image.image = bpy.data.images.load(tex_path)
-        mat.node_tree.links.new(diffuse_bsdf.inputs['Color'], tex_image.outputs['Color'])
+        nodes["DiffuseTex"].image = load_dds_image(tex_path, image_cache)
     else:
         print(f"Texture not found for {base_name}")
+        nodes.remove(nodes["DiffuseTex"])
 
 # Build the models!
-def build_mesh_from_data(mesh, obj, model_data, use_custom_normals, assign_material_colors):
-    """Build the mesh from parsed data."""
-    # Handle vertices, faces, normals, and materials
-    if use_custom_normals is False:
-        mesh.from_pydata(model_data["vertices"], [], model_data["faces"])
-        mesh.polygons.foreach_set("use_smooth", [True] * len(mesh.polygons))
-        if not is_blender_4_1():    # Blender 4.1 removed "use_auto_smooth" which was used on previous versions of the program.
-            mesh.use_auto_smooth = True
-        mesh.normals_split_custom_set_from_vertices(model_data["normals"])
-        print("  Parsed vertices and faces with normals from the model.")
-    else:
-        shade_flat = False
-        mesh.from_pydata(model_data["vertices"], [], model_data["faces"], shade_flat)
-        print("  Parsed vertices and faces with custom normals.")
-
-    # Add the UV map
+def build_mesh_from_data(mesh, obj, model_data, material_names, use_custom_normals, assign_material_colors, optimize_for_gpu=False):
+    """Build the mesh from parsed data. Returns the material slot of every material name."""
+    # Handle vertices and faces, the parsers hand these to us as contiguous arrays (vertices: (N, 3) float32, faces: (F, 3) int32)
+    vertices = model_data["vertices"]
+    faces = model_data["faces"]
+
+    # Reorder the triangles for the GPU's vertex cache if the user asked for it
+    if optimize_for_gpu:
+        faces = optimize_vertex_cache(faces, len(vertices))
+        print("  Reordered triangles for vertex cache locality.")
+
+    face_indices = faces.ravel()
+
+    # Allocate the vertices, loops and faces up front and upload them in bulk rather than through from_pydata
+    mesh.vertices.add(len(vertices))
+    mesh.loops.add(len(face_indices))
+    mesh.polygons.add(len(faces))
+
+    mesh.vertices.foreach_set("co", vertices.ravel())
+    mesh.loops.foreach_set("vertex_index", face_indices)
+    mesh.polygons.foreach_set("loop_start", np.arange(0, len(face_indices), 3, dtype=np.int32))
+    if not is_blender_3_6():    # Blender 3.6 made "loop_total" read-only, it's worked out from "loop_start" instead.
+        mesh.polygons.foreach_set("loop_total", np.full(len(faces), 3, dtype=np.int32))
+    mesh.polygons.foreach_set("use_smooth", [True] * len(faces))
+
+    # Add the UV map, one UV per loop gathered from the per-vertex UVs
     if "uv_map" in model_data:
         uv_map = model_data["uv_map"]
         uv_layer = mesh.uv_layers.new(name="UV_01")
-        for loop in mesh.loops:
-            uv_layer.data[loop.index].uv = uv_map[loop.vertex_index]
+        uv_layer.data.foreach_set("uv", uv_map[face_indices].ravel())
 
     # Handle weights
     if "bone_indices" in model_data and "bone_weights" in model_data:
         add_model_weights(obj, model_data["bone_indices"], model_data["bone_weights"])
 
     # Handle materials
+    slot_by_name: dict[str, int] = {}
     if "textures" in model_data:
-        # Create materials and add them to the object
-        materials = []
-        for texture_name in model_data["textures"]:
-            sanitized_name = ''.join(c for c in texture_name if c.isprintable())
-            mat = create_material(sanitized_name, assign_material_colors)
-            add_material(mat, obj)
-            materials.append(mat)
-
-        # Now assign materials to the faces based on the material index
-        for poly in mesh.polygons:
-            # Find material index for the current face
-            first_vertex = poly.vertices[0]
-            mat_index = model_data["material_index"][first_vertex] - 1
-            if mat_index < 0 or mat_index >= len(materials):
-                print(f"Warning: Material index {mat_index + 1} is invalid at face {poly.index}.")
-                mat_index = 0  # Assign to the first material if invalid
-            poly.material_index = mat_index
-
-    mesh.calc_tangents()
-    mesh.update()
\ No newline at end of file
+        # Create materials and add them to the object, textures that repeat share the same material slot
+        texture_slots = []
+        for sanitized_name in material_names:
+            if sanitized_name not in slot_by_name:
+                mat = create_material(sanitized_name, assign_material_colors)
+                mesh.materials.append(mat)
+                slot_by_name[sanitized_name] = len(mesh.materials) - 1
+            texture_slots.append(slot_by_name[sanitized_name])
+
+        # Now assign materials to the faces based on the material index of each face's first vertex
+        material_index = np.asarray(model_data["material_index"], dtype=np.int32)
+        face_material_index = material_index[faces[:, 0]] - 1
+
+        invalid_faces = (face_material_index < 0) | (face_material_index >= len(texture_slots))
+        if np.any(invalid_faces):
+            print(f"Warning: {np.count_nonzero(invalid_faces)} face(s) have an invalid material index, starting at face {np.argmax(invalid_faces)}.")
+            face_material_index[invalid_faces] = 0  # Assign to the first material if invalid
+
+        # Material indices point at textures, turn them into material slots
+        if texture_slots:
+            face_material_index = np.asarray(texture_slots, dtype=np.int32)[face_material_index]
+
+        mesh.polygons.foreach_set("material_index", face_material_index)
+
+    # Everything's been uploaded, so the edges only need working out once here. The parsers give us valid indices so there's no need to validate the mesh.
+    mesh.update(calc_edges=True)
+
+    # Handle normals
+    if use_custom_normals is False:
+        if not is_blender_4_1():    # Blender 4.1 removed "use_auto_smooth" which was used on previous versions of the program.
+            mesh.use_auto_smooth = True
+        # Blender only copies the normals straight out of the buffer when they're contiguous float32, otherwise it converts them one by one
+        normals = np.ascontiguousarray(model_data["normals"], dtype=np.float32)
+        mesh.normals_split_custom_set_from_vertices(normals)
+        print("  Parsed vertices and faces with normals from the model.")
+    else:
+        print("  Parsed vertices and faces with custom normals.")
+
+    return slot_by_name
\ No newline at end of file
@@ -4,17 +4,39 @@
 # -----------------------------------------------------
 """ Module with helper classes for reading binary file data. """
 
-import os
+import os, sys
 import bpy, struct, math
 import mathutils
+from array import array
+
+# -----------------------------------------------------
+
+# Pre-built structs for every format we've read so far, one cache per endianness, so the format string is only ever parsed once.
+STRUCT_CACHE: dict[bool, dict[str, struct.Struct]] = {True: {}, False: {}}
+
+def get_struct(is_little_endian: bool, fmt: str) -> struct.Struct:
+    """ Get the pre-built `struct.Struct` for a format string, building it the first time it's asked for. """
+    cache = STRUCT_CACHE[is_little_endian]
+    s = cache.get(fmt)
+    if s is None:
+        s = struct.Struct(("<" if is_little_endian else ">") + fmt)
+        cache[fmt] = s
+    return s
 
 # -----------------------------------------------------
 
 # Base class for reading various data types.
 class Reader():
     """ Data parser class. Used for reading binary data from a file! """
+    # Fixed attribute layout, so every read skips the instance dict
+    __slots__ = (
+        "offset", "data", "view", "LE", "length", "structs",
+        "ubyte_struct", "ushort_struct", "uint32_struct", "float32_struct",
+        "vec3f_struct", "vec4f_struct", "vec3ub_struct", "vec3us_struct",
+    )
+
     # Reader object constructor.
-    def __init__(self, buf: bytes, is_little_endian: bool = True):
+    def __init__(self, buf: bytes | memoryview, is_little_endian: bool = True):
         """ Construct a new `Reader` object. Input data, and if we want to use little endianness for our reading process. """
 
         # -------------------------------
@@ -26,9 +48,13 @@ class Reader():
         """ The offset or position we are currently at in reading the file. """
 
         # -- DATA BYTES
-        self.data: bytes = buf
+        self.data: bytes | memoryview = buf
         """ The bytes that the current instance of Reader is currently pulling from. """
 
+        # -- DATA VIEW
+        self.view: memoryview = buf if isinstance(buf, memoryview) else memoryview(buf)
+        """ A single memoryview over `data`, so reading raw bytes only ever slices it instead of wrapping `data` again. """
+
         # -- IS LITTLE ENDIAN
         self.LE: bool = is_little_endian
         """ Is this file being read in little endian? """
@@ -36,6 +62,24 @@ class Reader():
         # -- LENGTH OF THE FILE
         self.length: int = len(buf)
         """ Total number of bytes in the data buffer provided. """
+
+        # -- STRUCT CACHE
+        self.structs: dict[str, struct.Struct] = STRUCT_CACHE[is_little_endian]
+        """ The struct cache for this reader's endianness. Endianness never changes for a reader, so it's picked once here instead of on every read. """
+
+        # -------------------------------
+        # -- HOT STRUCTS ----------------
+        # -------------------------------
+        # The formats the parsers read per vertex/face, bound straight onto the reader so they skip `read()` entirely.
+
+        self.ubyte_struct: struct.Struct = get_struct(is_little_endian, "B")
+        self.ushort_struct: struct.Struct = get_struct(is_little_endian, "H")
+        self.uint32_struct: struct.Struct = get_struct(is_little_endian, "I")
+        self.float32_struct: struct.Struct = get_struct(is_little_endian, "f")
+        self.vec3f_struct: struct.Struct = get_struct(is_little_endian, "3f")
+        self.vec4f_struct: struct.Struct = get_struct(is_little_endian, "4f")
+        self.vec3ub_struct: struct.Struct = get_struct(is_little_endian, "3B")
+        self.vec3us_struct: struct.Struct = get_struct(is_little_endian, "3H")
     
     # - - - - - - - - - - - - - - -
 
@@ -54,12 +98,26 @@ class Reader():
         """ Manually set the read position offset at the given position. """
         self.offset = position
 
+    # Skip over any zero bytes of padding.
+    def skip_padding(self) -> int:
+        """ Move the offset forward past every consecutive zero byte, stopping at the first non-zero byte or the end of the data. Returns how many bytes were skipped. """
+        start = self.offset
+        while self.offset < self.length:
+            # Padding is usually only a few bytes long, so strip it from small windows instead of scanning the rest of the file
+            window = self.view[self.offset:self.offset + 64].tobytes()
+            padding = len(window) - len(window.lstrip(b"\x00"))
+            self.offset += padding
+            if padding < len(window):
+                break
+        return self.offset - start
+
     # - - - - - - - - - - - - - - -
     
     def read(self, fmt) -> tuple:
-        """ Using `struct.unpack_from()`, return the needed value, and advance the position forward by the number of bytes the desired type occupies. """
-        result = struct.unpack_from(("" if self.LE else ">") + fmt, self.data, self.offset)
-        self.offset += struct.calcsize(fmt)
+        """ Using a cached `struct.Struct`, return the needed value, and advance the position forward by the number of bytes the desired type occupies. """
+        s = self.structs.get(fmt) or get_struct(self.LE, fmt)
+        result = s.unpack_from(self.data, self.offset)
+        self.offset += s.size
         return result
     
     def read_string(self, length: int) -> str:
@@ -67,6 +125,21 @@ class Reader():
         result = self.read_bytes(length)
         return result.tobytes().decode()
     
+    def read_fixed_string(self, length: int) -> str:
+        """ Read a null padded string from `x` amount of bytes, cut off at the first null byte. The bytes come straight out of a cached `struct.Struct`. """
+        fmt = f"{length}s"
+        result = (self.structs.get(fmt) or get_struct(self.LE, fmt)).unpack_from(self.data, self.offset)[0]
+        self.offset += length
+        return result.split(b"\x00", 1)[0].decode(errors="replace")
+    
+    def read_array(self, typecode: str, count: int) -> array:
+        """ Read `count` values of one type at once into an `array.array` with the given typecode (like `"H"` or `"f"`), and advance the position forward past all of them. """
+        result = array(typecode)
+        result.frombytes(self.read_bytes(count * result.itemsize))
+        if self.LE != (sys.byteorder == "little"):  # array.array is always in the machine's byte order
+            result.byteswap()
+        return result
+    
     def read_bytes(self, length: int) -> memoryview:
         """ Read a series of `x` bytes. """
         result = self.read_bytes_at(0, length)
@@ -75,7 +148,8 @@ class Reader():
     
     def read_bytes_at(self, offset: int, length: int) -> memoryview:
         """ Read raw bytes from the given offset for the given number of bytes forward. """
-        return memoryview(self.data)[self.offset + offset:self.offset + offset + length]
+        start = self.offset + offset
+        return self.view[start:start + length]
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
@@ -85,7 +159,9 @@ class Reader():
 
     def ubyte(self) -> int:
         """ Read an unsigned 8 bit integer, and advance the position forward by 1 byte. """
-        return self.read("B")[0]
+        result = self.ubyte_struct.unpack_from(self.data, self.offset)[0]
+        self.offset += 1
+        return result
         
     def byte(self) -> int:
         """ Read a signed 8 bit integer, and advance the position forward by 1 byte. """
@@ -95,7 +171,9 @@ class Reader():
 
     def ushort(self) -> int:
         """ Read an unsigned 16 bit integer, and advance the position forward by 2 bytes. """
-        return self.read("H")[0]
+        result = self.ushort_struct.unpack_from(self.data, self.offset)[0]
+        self.offset += 2
+        return result
         
     def short(self) -> int:
         """ Read a signed 16 bit integer, and advance the position forward by 2 bytes. """
@@ -105,7 +183,9 @@ class Reader():
 
     def uint32(self) -> int:
         """ Read an unsigned 32 bit integer, and advance the position forward by 4 bytes. """
-        return self.read("I")[0]
+        result = self.uint32_struct.unpack_from(self.data, self.offset)[0]
+        self.offset += 4
+        return result
 
     def int32(self) -> int:
         """ Read a signed 32 bit integer, and advance the position forward by 4 bytes. """
@@ -129,7 +209,9 @@ class Reader():
         
     def float32(self) -> float:
         """ Read a signed 32 bit floating point value, and advance the position forward by 4 bytes. """
-        return self.read("f")[0]
+        result = self.float32_struct.unpack_from(self.data, self.offset)[0]
+        self.offset += 4
+        return result
         
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
@@ -163,11 +245,15 @@ class Reader():
 
     def vec3f(self) -> tuple[float, float, float]:
         """ Read three 32 bit floating point numbers, and return them as a 3-point vector as a tuple. Advances the position forward by 12 bytes. """
-        return self.read("3f")
+        result = self.vec3f_struct.unpack_from(self.data, self.offset)
+        self.offset += 12
+        return result
     
     def vec4f(self) -> tuple[float, float, float, float]:
         """ Read four 32 bit floating point numbers, and return them as a 4-point vector as a tuple. Advances the position forward by 16 bytes. """
-        return self.read("4f")
+        result = self.vec4f_struct.unpack_from(self.data, self.offset)
+        self.offset += 16
+        return result
     
     def vec3sb(self) -> tuple[int, int, int]:
         """ Read three signed 8 bit numbers, and return them as a 4-point vector as a tuple. Advances the position forward by 3 bytes. """
@@ -175,7 +261,9 @@ class Reader():
     
     def vec3ub(self) -> tuple[int, int, int]:
         """ Read three unsigned 8 bit numbers, and return them as a 4-point vector as a tuple. Advances the position forward by 3 bytes. """
-        return self.read("3B")
+        result = self.vec3ub_struct.unpack_from(self.data, self.offset)
+        self.offset += 3
+        return result
     
     def vec4sb(self) -> tuple[int, int, int, int]:
         """ Read four signed 8 bit numbers, and return them as a 4-point vector as a tuple. Advances the position forward by 4 bytes. """
@@ -199,6 +287,8 @@ class Reader():
     
     def vec3us(self) -> tuple[int, int, int]:
         """ Read three unsigned 16 bit numbers, and return them as a 3-point vector as a tuple. Advances the position forward by 6 bytes. """
-        return self.read("3H")
+        result = self.vec3us_struct.unpack_from(self.data, self.offset)
+        self.offset += 6
+        return result
     
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
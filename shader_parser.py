@@ -0,0 +1,45 @@
+# ----------------------------------------
+#   SHADER PARSER
+#       Reads the shader block that SRM
+#       and TRM files both share
+# ----------------------------------------
+""" Reads the shader block shared by SRM and TRM files. """
+
+import struct
+
+from .readers import get_struct
+
+# ----------------------------------------
+
+# Layout of a single shader: type, 4 float parameters and 3 offset/length pairs
+SHADER_FORMAT = "I4f6I"
+
+# Size of a single shader in bytes (44)
+SHADER_SIZE = struct.calcsize("<" + SHADER_FORMAT)
+
+# Read the shader block, SRM and TRM files both store it the exact same way
+def read_shaders(reader, shader_count: int, debug: bool = False) -> list[tuple]:
+    """Read `shader_count` shaders from the reader. Each one is returned as (type, parameters, opaque offset, opaque length, alpha offset, alpha length, additive offset, additive length)."""
+    shaders = []
+
+    # Every shader is the same fixed size record, so unpack them straight out of the block one after another.
+    # The parsers only call this with DEBUG on and skip the block otherwise, so this only speeds up debug imports
+    shader_block = reader.read_bytes(shader_count * SHADER_SIZE)
+    for fields in get_struct(reader.LE, SHADER_FORMAT).iter_unpack(shader_block):
+        shaderType = fields[0]
+        shaderParameters = fields[1:5]
+        opaqueOffset, opaqueLength, alphaOffset, alphaLength, additiveOffset, additiveLength = fields[5:]
+
+        if debug:
+            print(f"Shader Type: {shaderType}")
+            print(f"Shader Parameters: {shaderParameters}")
+            print(f"Opaque Offset: {opaqueOffset}")
+            print(f"Opaque Length: {opaqueLength}")
+            print(f"Alpha Offset: {alphaOffset}")
+            print(f"Alpha Length: {alphaLength}")
+            print(f"Additive Offset: {additiveOffset}")
+            print(f"Additive Length: {additiveLength}")
+
+        shaders.append((shaderType, shaderParameters, opaqueOffset, opaqueLength, alphaOffset, alphaLength, additiveOffset, additiveLength))
+
+    return shaders
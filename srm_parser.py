@@ -1,8 +1,29 @@
 import bpy
+import mmap
+import numpy as np
 
+from . import jit_kernels
 from .readers import Reader
+from .shader_parser import SHADER_SIZE, read_shaders
 from .bpy_util_funcs import *
 
+# Print every shader and material as they're parsed, off by default since printing inside the loops slows big models down
+DEBUG = False
+
+# Layout of a single SRM vertex (32 bytes)
+SRM_VERTEX_DTYPE = np.dtype([
+    ("position", "<3f4"),
+    ("tangent", "3u1"),
+    ("constant", "u1"),         # Always 2 for some reason
+    ("normal", "3u1"),
+    ("material_index", "u1"),
+    ("bone_indices", "3u1"),
+    ("u", "u1"),
+    ("bone_weights", "3u1"),
+    ("v", "u1"),
+    ("reserved", "4u1"),
+])
+
 class SRM():
     """ SRM class. Used for Soul Reaver 1 and 2 models that use `*.SRM` files. """
     # Class constructor.
@@ -56,8 +77,12 @@ class SRM():
         """ Parse the model file itself! """
         print(f"Parsing model data...\n")
 
-        # Initialize the reader
-        reader = Reader(open(self.model_file, "rb").read())
+        # Initialize the reader straight on top of a read-only memory map of the file, so it's never copied into memory as a whole
+        # The map stays valid after the file handle is closed and goes away with the reader once parsing is done
+        with open(self.model_file, "rb") as model_file:
+            model_map = mmap.mmap(model_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        reader = Reader(memoryview(model_map))
 
         # Dictionaries of data lists
         master_data_list: list[dict] = []
@@ -72,38 +97,27 @@ class SRM():
         shaderCount = reader.uint32()
         print(f"Shader Count: {shaderCount}")
 
-        for (_) in range(shaderCount):
-            shaderType = reader.uint32()
-            print(f"Shader Type: {shaderType}")
-            shaderParameters = reader.vec4f()
-            print(f"Shader Parameters: {shaderParameters}")
-            opaqueOffset = reader.uint32()
-            print(f"Opaque Offset: {opaqueOffset}")
-            opaqueLength = reader.uint32()
-            print(f"Opaque Length: {opaqueLength}")
-            alphaOffset = reader.uint32()
-            print(f"Alpha Offset: {alphaOffset}")
-            alphaLength = reader.uint32()
-            print(f"Alpha Length: {alphaLength}")
-            additiveOffset = reader.uint32()
-            print(f"Additive Offset: {additiveOffset}")
-            additiveLength = reader.uint32()
-            print(f"Additive Length: {additiveLength}")
+        # Nothing uses the shaders yet, so only bother reading them when they're going to be printed
+        if DEBUG:
+            read_shaders(reader, shaderCount, debug=True)
+        else:
+            reader.skip(shaderCount * SHADER_SIZE)
 
         textureCount = reader.uint32()
         print(f"\nMaterial Count: {textureCount}")
 
         textures = []
         for (_) in range(textureCount):
-            # Read the raw string
-            texture = reader.read_string(31)
+            # Read the null padded string
+            texture = reader.read_fixed_string(31)
             textureFlag = reader.ubyte()
             
             # Remove non-printable characters
-            sanitized_texture = ''.join(c for c in texture.strip() if c.isprintable())
+            sanitized_texture = sanitize_name(texture).strip()
             
             # Print the sanitized string
-            print(f"  Material: {sanitized_texture}")
+            if DEBUG:
+                print(f"  Material: {sanitized_texture}")
             
             # Append the sanitized string to the list
             textures.append(sanitized_texture)
@@ -122,12 +136,8 @@ class SRM():
         # THIS IS ACTUALLY BONE DATA BUT I HAVE NO IDEA HOW ITS PROPERLY STRUCTURED SO I'LL JUST SKIP OVER IT
         # ==========================================================================================================================================================
 
-        boneMatrices = []
-        for (_) in (range(32 + extraBoneCount)):
-            bone_a = reader.vec3f()
-            bone_b = reader.vec3f()
-            bone_c = reader.vec3f()
-            bone_d = reader.vec3f()
+        # Every bone is 4 vec3f's (48 bytes), none of it is used yet so skip the whole block in one go
+        reader.skip((32 + extraBoneCount) * 4 * 12)
 
         # --- DYNAMIC SENTINEL CHECK ---
         # Peek at the next 4 bytes without permanently moving the cursor
@@ -141,11 +151,8 @@ class SRM():
             # If it's NOT the sentinel, rewind so we don't skip the first boneFlag
             reader.seek(current_pos)
 
-        boneFlags = []
-        for (_) in (range(128)):
-            boneFlag = reader.ubyte()
-
-            boneFlags.append(boneFlag)
+        # 128 bone flag bytes, also unused for now
+        reader.skip(128)
 
         # ==============================================================================================================================
 
@@ -161,53 +168,40 @@ class SRM():
         # VERTEX DATA
         # ------------
 
-        vertices = []
-        normals = []
-        material_index = []
-        tangents = []
-        bone_indices = []
-        bone_weights = []
-        uv = []
-
-        for (_) in (range(vertexCount)):
-            # -- VERTICES ---------------------------
-            vertices.append(reader.vec3f())
+        # Read every vertex at once, the vertex block is just a tightly packed array of SRM_VERTEX_DTYPE
+        vertex_data = np.frombuffer(reader.data, dtype=SRM_VERTEX_DTYPE, count=vertexCount, offset=reader.offset)
+        reader.skip(vertexCount * SRM_VERTEX_DTYPE.itemsize)
 
-            # -- TANGENTS ---------------------------
-            tangent = reader.vec3ub()
-            tangent = convert_vertex_normal(tangent[0], tangent[1], tangent[2])
-            tangents.append(tangent)
+        # -- VERTICES ---------------------------
+        vertices = np.array(vertex_data["position"], copy=True)  # A copy, so it doesn't keep the file mapped
 
-            # -- CONSTANT (Always 2 for some reason)
-            constant = reader.ubyte()
+        # -- CONSTANT (Always 2 for some reason)
+        constant = int(vertex_data["constant"][-1]) if vertexCount else 2
 
-            # -- NORMALS ----------------------------
-            normal = reader.vec3ub()
-            normal = convert_vertex_normal(normal[0], normal[1], normal[2])
-            normals.append(normal)
+        # The same vertex block as raw bytes, one row per vertex
+        raw_vertices = vertex_data.view(np.uint8).reshape(vertexCount, SRM_VERTEX_DTYPE.itemsize)
 
-            # -- MATERIAL INDEX ---------------------
-            id = reader.ubyte()
-            material_index.append(id)
-
-            # -- INDICES ----------------------------
-            indices = reader.vec3ub()
-            bone_indices.append(indices)
-
-            # -- U ----------------------------------
-            u = reader.ubyte() / 255.0
-
-            # -- WEIGHTS ----------------------------
-            weights = reader.vec3ub()
-            bone_weights.append(weights)
+        if jit_kernels.HAS_NUMBA:
+            # -- TANGENTS / NORMALS / UVS -----------
+            # Numba can convert all three straight from the raw vertex bytes in a single pass
+            tangents, normals, uv = jit_kernels.decode_srm_vertex_bytes(raw_vertices)
+        else:
+            # -- TANGENTS / NORMALS -----------------
+            # The tangent and normal bytes sit next to each other (with the constant between them), so convert bytes 12-18 in one pass and split them after
+            tangent_normals = convert_vertex_normals_batch(raw_vertices[:, 12:19])
+            tangents = tangent_normals[:, 0:3]
+            normals = tangent_normals[:, 4:7]
 
-            # -- V ----------------------------------
-            v = 1 - reader.ubyte() / 255.0
+            # -- UVS --------------------------------
+            uv = convert_uvs_batch(np.column_stack((vertex_data["u"], vertex_data["v"])))
 
-            uv.append([u, v])
+        # -- MATERIAL INDEX ---------------------
+        # Each column is always copied out into its own contiguous uint8 array (np.ascontiguousarray would hand back a view of the file when the column is already contiguous), so nothing keeps the file mapped after parsing
+        material_index = np.array(vertex_data["material_index"], copy=True)
 
-            # Reserved
-            reader.skip(4)
+        # -- INDICES / WEIGHTS ------------------
+        bone_indices = np.array(vertex_data["bone_indices"], copy=True)
+        bone_weights = np.array(vertex_data["bone_weights"], copy=True)
 
         # --------------------------------------------------------------------------------------------------------
 
@@ -215,9 +209,13 @@ class SRM():
         # FACES
         # ------
 
-        faces = []
-        for (_) in (range(faceCount // 3)):
-            faces.append(reverse_vector(reader.vec3us()))
+        # The face block is just a packed list of u16 indices, so view all of it at once
+        triangleCount = faceCount // 3
+        face_data = np.frombuffer(reader.data, dtype="<u2", count=triangleCount * 3, offset=reader.offset).reshape(triangleCount, 3)
+        reader.skip(triangleCount * 6)
+
+        # Store the faces as one uniform (F, 3) array with their winding order reversed
+        faces = face_data[:, ::-1].astype(np.int32)
 
         print(f"\nMODEL PARSING COMPLETE!")
 
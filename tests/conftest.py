@@ -0,0 +1,112 @@
+# ------------------------------------------------
+#   TEST SETUP
+#       Loads the add-on outside of Blender and
+#       builds small synthetic model files.
+# ------------------------------------------------
+"""
+Loads the add-on's modules outside of Blender and builds small synthetic SRM/TRM files for the tests.
+
+`bpy` and `mathutils` only exist inside Blender, so they're replaced with mocks here. The add-on's own `__init__.py` registers Blender operators, so the package is set up without running it.
+"""
+
+import os
+import sys
+import types
+import struct
+import random
+from unittest.mock import MagicMock
+
+import pytest
+
+sys.modules.setdefault("bpy", MagicMock())
+sys.modules.setdefault("mathutils", MagicMock())
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+addon = types.ModuleType("io_scene_xrm")
+addon.__path__ = [ADDON_DIR]
+addon.__file__ = os.path.join(ADDON_DIR, "__init__.py")
+sys.modules.setdefault("io_scene_xrm", addon)
+# pytest imports the checkout's `__init__.py` under the folder's own name, which may not be io_scene_xrm
+sys.modules.setdefault(os.path.basename(ADDON_DIR), addon)
+
+# ------------------------
+
+SHADER = struct.pack("<I4f6I", 1, 1.0, 2.0, 3.0, 4.0, 1, 2, 3, 4, 5, 6)
+
+# Random vertex fields shared by both formats
+def random_vertices(rng: random.Random, vertex_count: int, texture_count: int) -> dict:
+    """Random positions, normal/UV bytes, material indices and bone data for `vertex_count` vertices."""
+    return {
+        "position": [[rng.uniform(-5, 5) for (_) in range(3)] for (_) in range(vertex_count)],
+        "tangent": [[rng.randrange(256) for (_) in range(3)] for (_) in range(vertex_count)],
+        "normal": [[rng.randrange(256) for (_) in range(3)] for (_) in range(vertex_count)],
+        "material_index": [rng.randrange(1, texture_count + 1) for (_) in range(vertex_count)],
+        "bone_indices": [[rng.randrange(40) for (_) in range(3)] for (_) in range(vertex_count)],
+        "bone_weights": [[rng.randrange(256) for (_) in range(3)] for (_) in range(vertex_count)],
+        "u": [rng.randrange(256) for (_) in range(vertex_count)],
+        "v": [rng.randrange(256) for (_) in range(vertex_count)],
+    }
+
+# Build an SRM file
+def build_srm(rng: random.Random, vertex_count: int = 40, triangle_count: int = 30, texture_count: int = 3, extra_bones: int = 2) -> tuple[bytes, dict]:
+    """Build a synthetic SRM file. Returns the file's bytes and the data that went into it."""
+    data = random_vertices(rng, vertex_count, texture_count)
+    data["textures"] = [f"tex_{i}" for i in range(texture_count)]
+    data["faces"] = [[rng.randrange(vertex_count) for (_) in range(3)] for (_) in range(triangle_count)]
+
+    out = bytearray(b"SRM\x00")
+    out += struct.pack("<I", 2) + SHADER * 2
+    out += struct.pack("<I", texture_count)
+    for name in data["textures"]:
+        out += (name.encode() + b"\x01").ljust(31, b"\x00") + b"\x05"  # Non-printable junk before the null terminator
+    out += struct.pack("<I", extra_bones)
+    out += bytes(48 * (32 + extra_bones))
+    out += struct.pack("<I", 0x80000000)
+    out += bytes([1] * 128)
+    out += struct.pack("<II", vertex_count, triangle_count * 3)
+    for i in range(vertex_count):
+        out += struct.pack("<3f", *data["position"][i])
+        out += bytes(data["tangent"][i]) + b"\x02"
+        out += bytes(data["normal"][i]) + bytes([data["material_index"][i]])
+        out += bytes(data["bone_indices"][i]) + bytes([data["u"][i]])
+        out += bytes(data["bone_weights"][i]) + bytes([data["v"][i]])
+        out += bytes(4)
+    for face in data["faces"]:
+        out += struct.pack("<3H", *face)
+    return bytes(out), data
+
+# Build a TRM file
+def build_trm(rng: random.Random, vertex_count: int = 40, triangle_count: int = 30, texture_count: int = 3, padding: tuple[int, int] = (6, 2)) -> tuple[bytes, dict]:
+    """Build a synthetic TRM file. Returns the file's bytes and the data that went into it."""
+    data = random_vertices(rng, vertex_count, texture_count)
+    data["position"] = [[rng.uniform(5, 10) for (_) in range(3)] for (_) in range(vertex_count)]  # Keep the first byte after the padding non-zero
+    data["textures"] = [str(100 + i) for i in range(texture_count)]
+    data["faces"] = [[rng.randrange(1, vertex_count) for (_) in range(3)] for (_) in range(triangle_count)]
+
+    out = bytearray(b"TRM\x02")
+    out += struct.pack("<I", 2) + SHADER * 2
+    out += struct.pack("<I", texture_count)
+    for texture_id in data["textures"]:
+        out += struct.pack("<H", int(texture_id))
+    out += bytes(padding[0])
+    out += struct.pack("<II", triangle_count * 3, vertex_count)  # The padding skip stops at the first non-zero byte, so keep the face count's low byte non-zero
+    for face in data["faces"]:
+        out += struct.pack("<3H", *face)
+    out += bytes(padding[1])
+    for i in range(vertex_count):
+        out += struct.pack("<3f", *data["position"][i])
+        out += bytes(data["normal"][i]) + bytes([data["material_index"][i]])
+        out += bytes(data["bone_indices"][i]) + bytes([data["u"][i]])
+        out += bytes(data["bone_weights"][i]) + bytes([data["v"][i]])
+    return bytes(out), data
+
+# Write a synthetic model to disk
+@pytest.fixture
+def model_file(tmp_path):
+    """Write model bytes to a temporary file and return its path."""
+    def write(contents: bytes, name: str) -> str:
+        path = tmp_path / name
+        path.write_bytes(contents)
+        return str(path)
+    return write
@@ -0,0 +1,184 @@
+"""Tests for the parts of `bpy_util_funcs` that don't need Blender."""
+
+import random
+from unittest.mock import MagicMock
+
+from io_scene_xrm import bpy_util_funcs
+from io_scene_xrm.bpy_util_funcs import add_model_weights, apply_material_template, sanitize_name
+
+# ------------------------
+
+# Stands in for a Blender object, applying each VertexGroup.add the way Blender does
+class FakeObject:
+    def __init__(self):
+        self.vertex_groups = self
+        self.group_names = []
+        self.weights = {}
+
+    def new(self, name):
+        self.group_names.append(name)
+        return FakeGroup(self, name)
+
+class FakeGroup:
+    def __init__(self, obj, name):
+        self.obj = obj
+        self.name = name
+
+    def add(self, indices, weight, mode):
+        assert mode == 'REPLACE'
+        for index in indices:
+            self.obj.weights[(index, self.name)] = weight
+
+# Assign the weights one influence at a time, like the importer originally did
+def add_weights_one_by_one(obj, bone_indices, bone_weights):
+    groups = {}
+    for vertex_index, (vertex_bone_ids, vertex_bone_weights) in enumerate(zip(bone_indices, bone_weights)):
+        for bone_index, weight in zip(vertex_bone_ids, vertex_bone_weights):
+            if weight == 0:
+                continue
+            group_name = f"bone_{bone_index}"
+            if group_name not in groups:
+                groups[group_name] = obj.vertex_groups.new(name=group_name)
+            groups[group_name].add([vertex_index], weight / 255.0, 'REPLACE')
+
+# ------------------------
+
+def test_sanitize_name_ascii():
+    assert sanitize_name("tex\x01_0\x7f\x00") == "tex_0"
+
+def test_sanitize_name_keeps_printable():
+    assert sanitize_name("Raziel Body 01") == "Raziel Body 01"
+
+def test_sanitize_name_non_ascii():
+    assert sanitize_name("café\u0085\x02") == "café"
+
+def test_sanitize_name_matches_isprintable():
+    name = "".join(chr(c) for c in range(0x250))
+    assert sanitize_name(name) == "".join(c for c in name if c.isprintable())
+
+# ------------------------
+
+def check_weights(bone_indices, bone_weights):
+    expected, actual = FakeObject(), FakeObject()
+    add_weights_one_by_one(expected, bone_indices, bone_weights)
+    add_model_weights(actual, bone_indices, bone_weights)
+
+    assert actual.group_names == expected.group_names
+    assert actual.weights == expected.weights
+
+def test_add_model_weights_duplicate_bone_last_slot_wins():
+    # Vertex 0 lists bone 3 twice, with the higher weight first
+    check_weights([[3, 3, 1], [2, 0, 0]], [[200, 50, 5], [255, 0, 0]])
+
+def test_add_model_weights_duplicate_bone_with_zero_weight():
+    # A zero weight is skipped, so it doesn't replace the earlier slot
+    check_weights([[4, 4, 4]], [[10, 90, 0]])
+
+def test_add_model_weights_random():
+    rng = random.Random(4)
+    bone_indices = [[rng.randrange(6) for (_) in range(3)] for (_) in range(200)]
+    bone_weights = [[rng.choice((0, 0, 64, 128, 255)) for (_) in range(3)] for (_) in range(200)]
+    check_weights(bone_indices, bone_weights)
+
+def test_add_model_weights_empty():
+    obj = FakeObject()
+    add_model_weights(obj, [], [])
+    assert obj.group_names == [] and obj.weights == {}
+
+# ------------------------
+
+def test_apply_material_template_rebuilds_material_in_use(monkeypatch):
+    bpy = MagicMock()
+    monkeypatch.setattr(bpy_util_funcs, "bpy", bpy)
+
+    old_mat = MagicMock()
+    old_mat.name = "skin"
+    old_mat.users = 3  # Still used by a model imported earlier
+    obj = MagicMock()
+    obj.data.materials = [old_mat]
+    template = MagicMock()
+
+    new_mat = apply_material_template(obj, 0, template)
+
+    assert new_mat is template.copy.return_value
+    assert new_mat.name == "skin"
+    assert new_mat.diffuse_color is old_mat.diffuse_color
+    old_mat.user_remap.assert_called_once_with(new_mat)
+    bpy.data.materials.remove.assert_called_once_with(old_mat)
+
+# ------------------------
+
+def test_patch_dds_flags_after_clear(tmp_path):
+    path = tmp_path / "SKIN.DDS"
+    path.write_bytes(bytes(16))
+    bpy_util_funcs.patched_dds_paths.clear()
+
+    bpy_util_funcs.patch_dds_flags(str(path))
+    assert path.read_bytes()[8:12] == bpy_util_funcs.DDS_PATCHED_FLAGS
+
+    # The file gets replaced with an unpatched one, which a new import has to patch again
+    path.write_bytes(bytes(16))
+    bpy_util_funcs.patched_dds_paths.clear()
+    bpy_util_funcs.patch_dds_flags(str(path))
+    assert path.read_bytes()[8:12] == bpy_util_funcs.DDS_PATCHED_FLAGS
+
+# ------------------------
+
+# Stands in for bpy.data.images, loading a new image unless an existing one is allowed
+class FakeImages:
+    def __init__(self):
+        self.loaded = []
+
+    def load(self, path, check_existing=False):
+        if check_existing:
+            for image in self.loaded:
+                if image.filepath == path:
+                    return image
+
+        image = MagicMock()
+        image.filepath = path
+        image.users = 0
+        image.colorspace_settings.name = 'sRGB'
+        self.loaded.append(image)
+        return image
+
+def load(path, image_cache, non_color=False):
+    image = bpy_util_funcs.load_dds_image(path, image_cache, non_color)
+    image.users += 1  # Assigned to a node
+    return image
+
+def test_load_dds_image_keeps_color_spaces_apart(monkeypatch, tmp_path):
+    images = FakeImages()
+    monkeypatch.setattr(bpy_util_funcs.bpy.data, "images", images)
+    path = str(tmp_path / "SKIN.DDS")
+    image_cache = {}
+
+    diffuse = load(path, image_cache)
+    assert load(path, image_cache) is diffuse
+
+    # The same file used as a normal map gets its own Non-Color image, the diffuse one is left alone
+    normal = load(path, image_cache, non_color=True)
+    assert normal is not diffuse
+    assert normal.colorspace_settings.name == 'Non-Color'
+    assert diffuse.colorspace_settings.name == 'sRGB'
+    assert load(path, image_cache, non_color=True) is normal
+
+    # A later import can't change the color space of either image
+    next_cache = {}
+    assert load(path, next_cache, non_color=True).colorspace_settings.name == 'Non-Color'
+    assert load(path, next_cache) is diffuse
+    assert diffuse.colorspace_settings.name == 'sRGB'
+
+def test_load_dds_image_non_color_first(monkeypatch, tmp_path):
+    images = FakeImages()
+    monkeypatch.setattr(bpy_util_funcs.bpy.data, "images", images)
+    path = str(tmp_path / "SKIN_N.DDS")
+    image_cache = {}
+
+    normal = load(path, image_cache, non_color=True)
+    assert normal.colorspace_settings.name == 'Non-Color'
+    assert len(images.loaded) == 1
+
+    diffuse = load(path, image_cache)
+    assert diffuse is not normal
+    assert diffuse.colorspace_settings.name == 'sRGB'
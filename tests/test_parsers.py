@@ -0,0 +1,102 @@
+"""Tests for the SRM and TRM parsers, run on small synthetic files."""
+
+import mmap
+import random
+
+import numpy as np
+import pytest
+
+from conftest import build_srm, build_trm
+from io_scene_xrm import jit_kernels
+from io_scene_xrm.srm_parser import SRM
+from io_scene_xrm.trm_parser import TRM
+
+# ------------------------
+
+# Check a parsed model against the data that went into its file
+def check_mesh(mesh: dict, data: dict):
+    np.testing.assert_allclose(mesh["vertices"], np.float32(data["position"]).reshape(-1, 3), rtol=1e-6)
+    np.testing.assert_array_equal(mesh["normals"], np.float32(data["normal"]).reshape(-1, 3) - 127)
+    np.testing.assert_allclose(mesh["uv_map"][:, 0], np.float32(data["u"]) / 255, rtol=1e-6)
+    np.testing.assert_allclose(mesh["uv_map"][:, 1], 1 - np.float32(data["v"]) / 255, rtol=1e-6, atol=1e-7)
+    np.testing.assert_array_equal(mesh["faces"], np.int32(data["faces"]).reshape(-1, 3)[:, ::-1])
+    np.testing.assert_array_equal(mesh["material_index"], data["material_index"])
+    np.testing.assert_array_equal(mesh["bone_indices"], np.uint8(data["bone_indices"]).reshape(-1, 3))
+    np.testing.assert_array_equal(mesh["bone_weights"], np.uint8(data["bone_weights"]).reshape(-1, 3))
+    assert mesh["textures"] == data["textures"]
+
+# ------------------------
+
+@pytest.mark.parametrize("vertex_count, triangle_count", [(40, 30), (1, 1), (0, 0)])
+def test_srm_parse(model_file, vertex_count, triangle_count):
+    contents, data = build_srm(random.Random(1), vertex_count, triangle_count)
+    mesh = SRM(model_file(contents, "model.SRM")).mesh_data[0]
+
+    check_mesh(mesh, data)
+    np.testing.assert_array_equal(mesh["tangents"], np.float32(data["tangent"]).reshape(-1, 3) - 127)
+    assert mesh["constant"] == 2
+
+@pytest.mark.parametrize("vertex_count, triangle_count", [(40, 30), (2, 1)])
+def test_trm_parse(model_file, vertex_count, triangle_count):
+    contents, data = build_trm(random.Random(2), vertex_count, triangle_count)
+    mesh = TRM(model_file(contents, "model.TRM")).mesh_data[0]
+
+    check_mesh(mesh, data)
+
+# ------------------------
+
+@pytest.mark.skipif(not jit_kernels.HAS_NUMBA, reason="Numba isn't installed")
+@pytest.mark.parametrize("parser, build, name", [(SRM, build_srm, "model.SRM"), (TRM, build_trm, "model.TRM")])
+def test_numba_matches_numpy(model_file, monkeypatch, parser, build, name):
+    contents, _ = build(random.Random(3))
+    path = model_file(contents, name)
+
+    with_numba = parser(path).mesh_data[0]
+    monkeypatch.setattr(jit_kernels, "HAS_NUMBA", False)
+    without_numba = parser(path).mesh_data[0]
+
+    for key, value in with_numba.items():
+        if isinstance(value, np.ndarray):
+            np.testing.assert_allclose(value, without_numba[key], rtol=1e-6, atol=1e-6, err_msg=key)
+
+# ------------------------
+
+# With 0 or 1 vertices every column is already contiguous, which is when a lazy copy would hand back a view of the file instead
+@pytest.mark.parametrize("parser, build, name, vertex_count, triangle_count", [
+    (SRM, build_srm, "model.SRM", 0, 0),
+    (SRM, build_srm, "model.SRM", 1, 1),
+    (SRM, build_srm, "model.SRM", 40, 30),
+    (TRM, build_trm, "model.TRM", 2, 1),
+    (TRM, build_trm, "model.TRM", 40, 30),
+])
+@pytest.mark.parametrize("use_numba", [False, True])
+def test_mesh_data_is_copied_out_of_the_file(model_file, monkeypatch, parser, build, name, vertex_count, triangle_count, use_numba):
+    if use_numba and not jit_kernels.HAS_NUMBA:
+        pytest.skip("Numba isn't installed")
+    monkeypatch.setattr(jit_kernels, "HAS_NUMBA", use_numba)
+
+    contents, _ = build(random.Random(5), vertex_count, triangle_count)
+    mesh = parser(model_file(contents, name)).mesh_data[0]
+
+    # No array may be a view of the mapped file, or it would keep the file mapped
+    for key, value in mesh.items():
+        if isinstance(value, np.ndarray):
+            base = value
+            while isinstance(base.base, np.ndarray):
+                base = base.base
+            assert not isinstance(base.base, (memoryview, mmap.mmap)), key
+
+# ------------------------
+
+# Without Numba the parsers have to get by with NumPy alone, no kernel may be reached from that path
+@pytest.mark.parametrize("parser, build, name", [(SRM, build_srm, "model.SRM"), (TRM, build_trm, "model.TRM")])
+def test_numpy_path_never_calls_a_kernel(model_file, monkeypatch, parser, build, name):
+    def no_kernel(*args):
+        raise AssertionError("Numba kernel called with HAS_NUMBA off")
+
+    monkeypatch.setattr(jit_kernels, "HAS_NUMBA", False)
+    for kernel in ("decode_srm_vertex_bytes", "decode_trm_vertex_bytes"):
+        monkeypatch.setattr(jit_kernels, kernel, no_kernel, raising=False)
+
+    contents, data = build(random.Random(6))
+    check_mesh(parser(model_file(contents, name)).mesh_data[0], data)
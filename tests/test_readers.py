@@ -0,0 +1,60 @@
+"""Tests for the `Reader` class."""
+
+import struct
+
+from io_scene_xrm.readers import Reader
+
+# ------------------------
+
+def test_read_array_little_endian():
+    reader = Reader(struct.pack("<3H", 1, 2, 0xABCD) + b"x")
+    assert reader.read_array("H", 3).tolist() == [1, 2, 0xABCD]
+    assert reader.tell() == 6
+
+def test_read_array_big_endian():
+    reader = Reader(struct.pack(">2I", 1, 0x01020304), is_little_endian=False)
+    assert reader.read_array("I", 2).tolist() == [1, 0x01020304]
+
+def test_read_array_empty():
+    reader = Reader(b"")
+    assert reader.read_array("H", 0).tolist() == []
+    assert reader.tell() == 0
+
+# ------------------------
+
+def test_skip_padding_stops_at_first_non_zero_byte():
+    reader = Reader(b"ab" + bytes(5) + b"\x07z")
+    reader.seek(2)
+    assert reader.skip_padding() == 5
+    assert reader.ubyte() == 7
+
+def test_skip_padding_longer_than_one_window():
+    reader = Reader(bytes(200) + b"\x01")
+    assert reader.skip_padding() == 200
+    assert reader.tell() == 200
+
+def test_skip_padding_to_end_of_data():
+    reader = Reader(bytes(130))
+    assert reader.skip_padding() == 130
+    assert reader.tell() == 130
+
+def test_skip_padding_without_padding():
+    reader = Reader(b"\x01\x00")
+    assert reader.skip_padding() == 0
+    assert reader.tell() == 0
+
+# ------------------------
+
+def test_read_fixed_string_cuts_at_null():
+    reader = Reader(b"name\x00junk" + b"\x09")
+    assert reader.read_fixed_string(9) == "name"
+    assert reader.ubyte() == 9
+
+def test_read_fixed_string_without_null():
+    reader = Reader(b"abcd")
+    assert reader.read_fixed_string(4) == "abcd"
+
+def test_read_fixed_string_memoryview():
+    reader = Reader(memoryview(b"xyz\x00\x00"))
+    assert reader.read_fixed_string(5) == "xyz"
+    assert reader.tell() == 5
@@ -0,0 +1,21 @@
+"""Tests for the shader block reader."""
+
+from conftest import SHADER
+from io_scene_xrm.readers import Reader
+from io_scene_xrm.shader_parser import SHADER_SIZE, read_shaders
+
+# ------------------------
+
+def test_shader_size():
+    assert SHADER_SIZE == len(SHADER) == 44
+
+def test_read_shaders():
+    reader = Reader(SHADER * 2 + b"\x05")
+    shaders = read_shaders(reader, 2)
+
+    assert shaders == [(1, (1.0, 2.0, 3.0, 4.0), 1, 2, 3, 4, 5, 6)] * 2
+    assert reader.ubyte() == 5
+
+def test_read_shaders_debug(capsys):
+    read_shaders(Reader(SHADER), 1, debug=True)
+    assert "Shader Type: 1" in capsys.readouterr().out
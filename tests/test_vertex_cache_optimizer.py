@@ -0,0 +1,46 @@
+"""Tests for the vertex cache optimizer."""
+
+import numpy as np
+
+from io_scene_xrm.vertex_cache_optimizer import optimize_vertex_cache
+
+# ------------------------
+
+# A grid of quads split into triangles, in a deliberately scattered order
+def grid_faces(size: int, seed: int = 0) -> np.ndarray:
+    faces = []
+    for y in range(size):
+        for x in range(size):
+            a = y * (size + 1) + x
+            b, c, d = a + 1, a + size + 1, a + size + 2
+            faces += [(a, b, c), (b, d, c)]
+    faces = np.array(faces, dtype=np.int32)
+    return faces[np.random.default_rng(seed).permutation(len(faces))]
+
+# Average number of vertices that miss a FIFO cache per triangle
+def acmr(faces: np.ndarray, cache_size: int = 16) -> float:
+    cache, misses = [], 0
+    for v in faces.ravel().tolist():
+        if v not in cache:
+            misses += 1
+            cache = [v] + cache[:cache_size - 1]
+    return misses / len(faces)
+
+# ------------------------
+
+def test_keeps_the_same_triangles():
+    faces = grid_faces(12)
+    optimized = optimize_vertex_cache(faces, 13 * 13)
+
+    assert optimized.shape == faces.shape
+    assert sorted(map(tuple, optimized.tolist())) == sorted(map(tuple, faces.tolist()))
+
+def test_improves_cache_reuse():
+    faces = grid_faces(12)
+    assert acmr(optimize_vertex_cache(faces, 13 * 13)) < acmr(faces)
+
+def test_empty_and_unused_vertices():
+    assert len(optimize_vertex_cache(np.zeros((0, 3), dtype=np.int32), 0)) == 0
+
+    faces = np.array([[5, 6, 7]], dtype=np.int32)
+    np.testing.assert_array_equal(optimize_vertex_cache(faces, 10), faces)
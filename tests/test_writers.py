@@ -0,0 +1,181 @@
+"""Tests for the `Writer` class, reading everything back with `Reader`."""
+
+import gc
+import weakref
+
+import numpy as np
+import pytest
+
+from io_scene_xrm.readers import Reader
+from io_scene_xrm.writers import Writer
+
+# ------------------------
+
+# Write one of every kind of value
+def write_sample(writer: Writer):
+    writer.uint32(7)
+    writer.vec3f((1.0, 2.0, 3.0))
+    writer.vec3ub((1, 2, 255))
+    writer.vec3sb((-1, 0, 1))
+    writer.num_string("abc")
+    writer.vec3us_bulk(np.array([[1, 2, 3], [4, 5, 6]]))
+
+# Read back what `write_sample` wrote
+def check_sample(data: bytes, is_little_endian: bool = True):
+    reader = Reader(data, is_little_endian)
+    assert reader.uint32() == 7
+    assert reader.vec3f() == (1.0, 2.0, 3.0)
+    assert reader.vec3ub() == (1, 2, 255)
+    assert reader.vec3sb() == (-1, 0, 1)
+    assert reader.uint32() == 3
+    assert reader.read_string(3) == "abc"
+    assert reader.vec3us() == (1, 2, 3)
+    assert reader.vec3us() == (4, 5, 6)
+    assert reader.tell() == len(data)
+
+# ------------------------
+
+def test_round_trip_in_memory():
+    writer = Writer(None)
+    write_sample(writer)
+    assert writer.length == writer.offset == len(writer.file)
+    check_sample(bytes(writer.file))
+
+def test_round_trip_big_endian():
+    writer = Writer(None, is_little_endian=False)
+    write_sample(writer)
+    check_sample(bytes(writer.file), is_little_endian=False)
+
+def test_round_trip_reserved():
+    writer = Writer(None, reserve=256)
+    write_sample(writer)
+    assert len(writer.file) == 256
+    check_sample(bytes(writer.file[:writer.length]))
+
+def test_round_trip_save(tmp_path):
+    writer = Writer(None, reserve=256)
+    write_sample(writer)
+
+    path = tmp_path / "folder" / "model.bin"
+    writer.save(str(path))
+    check_sample(path.read_bytes())
+
+def test_round_trip_file_path(tmp_path):
+    path = tmp_path / "model.bin"
+    writer = Writer(str(path))
+    write_sample(writer)
+    writer.close()
+    check_sample(path.read_bytes())
+
+# ------------------------
+
+def test_overwrite_in_place():
+    writer = Writer(None)
+    writer.uint32(1)
+    writer.uint32(2)
+    writer.seek(0)
+    writer.uint32(9)
+    assert bytes(writer.file) == bytes.fromhex("0900000002000000")
+    assert writer.length == 8
+
+def test_seek_past_end_fills_with_zeros():
+    writer = Writer(None)
+    writer.ubyte(1)
+    writer.seek(4)
+    writer.ubyte(2)
+    assert bytes(writer.file) == b"\x01\x00\x00\x00\x02"
+    assert writer.length == 5
+
+# ------------------------
+
+def test_append_to_non_empty_bytearray():
+    buffer = bytearray(b"head")
+    writer = Writer(buffer)
+    assert writer.tell() == 4
+
+    writer.uint32(7)
+    assert writer.file is buffer
+    assert bytes(buffer) == b"head" + bytes.fromhex("07000000")
+    assert writer.length == writer.offset == 8
+
+def test_seek_past_end_of_non_empty_bytearray():
+    writer = Writer(bytearray(b"ab"))
+    writer.seek(5)
+    writer.ubyte(9)
+    assert bytes(writer.file) == b"ab\x00\x00\x00\x09"
+    assert writer.length == 6
+
+def test_overwrite_start_of_non_empty_bytearray():
+    writer = Writer(bytearray(b"abcdef"))
+    writer.seek(1)
+    writer.ascii_string("XY")
+    assert bytes(writer.file) == b"aXYdef"
+    assert writer.length == 6
+
+def test_save_non_empty_bytearray(tmp_path):
+    writer = Writer(bytearray(b"head"))
+    write_sample(writer)
+
+    path = tmp_path / "model.bin"
+    writer.save(str(path))
+    data = path.read_bytes()
+    assert data[:4] == b"head"
+    check_sample(data[4:])
+
+# ------------------------
+
+def test_file_writer_tracks_offset_and_length(tmp_path):
+    path = tmp_path / "model.bin"
+    with Writer(str(path)) as writer:
+        writer.uint32(1)
+        writer.uint32(2)
+        assert writer.offset == writer.length == writer.tell() == 8
+
+        writer.seek(0)
+        writer.uint32(9)
+        assert writer.offset == 4
+        assert writer.length == 8
+
+    assert writer.file is None
+    assert path.read_bytes() == bytes.fromhex("0900000002000000")
+
+def test_file_writer_closes_on_error(tmp_path):
+    path = tmp_path / "model.bin"
+    try:
+        with Writer(str(path)) as writer:
+            writer.uint32(1)
+            raise RuntimeError
+    except RuntimeError:
+        pass
+
+    assert writer.file is None
+    assert path.read_bytes() == bytes.fromhex("01000000")
+
+# ------------------------
+
+def test_writer_is_freed_without_the_garbage_collector():
+    writer = Writer(None)
+    writer.uint32(1)
+    ref = weakref.ref(writer)
+
+    gc.disable()
+    try:
+        del writer
+        assert ref() is None
+    finally:
+        gc.enable()
+
+def test_file_writer_flushes_when_freed(tmp_path):
+    path = tmp_path / "model.bin"
+    writer = Writer(str(path))
+    writer.uint32(5)
+
+    del writer
+    assert path.read_bytes() == bytes.fromhex("05000000")
+
+def test_file_writer_save_raises(tmp_path):
+    with Writer(str(tmp_path / "model.bin")) as writer:
+        with pytest.raises(ValueError):
+            writer.save(str(tmp_path / "other.bin"))
+
+    assert not (tmp_path / "other.bin").exists()
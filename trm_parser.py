@@ -1,8 +1,26 @@
 import bpy
+import mmap
+import numpy as np
 
+from . import jit_kernels
 from .readers import Reader
+from .shader_parser import SHADER_SIZE, read_shaders
 from .bpy_util_funcs import *
 
+# Print every shader and texture as they're parsed, off by default since printing inside the loops slows big models down
+DEBUG = False
+
+# Layout of a single TRM vertex (24 bytes)
+TRM_VERTEX_DTYPE = np.dtype([
+    ("position", "<3f4"),
+    ("normal", "3u1"),
+    ("material_index", "u1"),
+    ("bone_indices", "3u1"),
+    ("u", "u1"),
+    ("bone_weights", "3u1"),
+    ("v", "u1"),
+])
+
 class TRM():
     """ TRM class. Used for Tomb Raider 1-5 models that use `*.TRM` files. """
     # Class constructor.
@@ -58,8 +76,12 @@ class TRM():
         """ Parse the model file itself! """
         print(f"Parsing model data...\n")
 
-        # Initialize the reader
-        reader = Reader(open(self.model_file, "rb").read())
+        # Initialize the reader straight on top of a read-only memory map of the file, so it's never copied into memory as a whole
+        # The map stays valid after the file handle is closed and goes away with the reader once parsing is done
+        with open(self.model_file, "rb") as model_file:
+            model_map = mmap.mmap(model_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        reader = Reader(memoryview(model_map))
 
         # Dictionaries of data lists
         master_data_list: list[dict] = []
@@ -74,44 +96,25 @@ class TRM():
         shaderCount = reader.uint32()
         print(f"Shader Count: {shaderCount}")
 
-        for (_) in range(shaderCount):
-            shaderType = reader.uint32()
-            print(f"Shader Type: {shaderType}")
-            shaderParameters = reader.vec4f()
-            print(f"Shader Parameters: {shaderParameters}")
-            opaqueOffset = reader.uint32()
-            print(f"Opaque Offset: {opaqueOffset}")
-            opaqueLength = reader.uint32()
-            print(f"Opaque Length: {opaqueLength}")
-            alphaOffset = reader.uint32()
-            print(f"Alpha Offset: {alphaOffset}")
-            alphaLength = reader.uint32()
-            print(f"Alpha Length: {alphaLength}")
-            additiveOffset = reader.uint32()
-            print(f"Additive Offset: {additiveOffset}")
-            additiveLength = reader.uint32()
-            print(f"Additive Length: {additiveLength}")
+        # Nothing uses the shaders yet, so only bother reading them when they're going to be printed
+        if DEBUG:
+            read_shaders(reader, shaderCount, debug=True)
+        else:
+            reader.skip(shaderCount * SHADER_SIZE)
 
         textureCount = reader.uint32()
         print(f"\nTexture Count: {textureCount}")
 
-        textures = []
-
-        for (_) in range(textureCount):
-            texture_num = reader.ushort()
-            print(f"  Texture ID: {texture_num}.DDS")
-
-            textures.append(str(texture_num))
+        # The texture IDs are one packed block of u16's, so read them all at once
+        texture_ids = reader.read_array("H", textureCount)
+        textures = [str(texture_num) for texture_num in texture_ids]
 
-        # Dynamically skip padding made of consecutive zero bytes (up to a safe limit)
-        zero_count = 0
+        if DEBUG:
+            for texture_num in texture_ids:
+                print(f"  Texture ID: {texture_num}.DDS")
 
-        # We'll scan ahead until we find a non-zero byte
-        while reader.offset < reader.length:
-            if reader.ubyte() != 0:
-                reader.seek(reader.tell() - 1)  # Rewind one byte so the next read is correct
-                break
-            zero_count += 1
+        # Dynamically skip padding made of consecutive zero bytes
+        zero_count = reader.skip_padding()
 
         print(f"Skipped {zero_count} padding byte(s)")
 
@@ -127,19 +130,16 @@ class TRM():
         # FACES
         # ------
 
-        faces = []
+        # The face block is just a packed list of u16 indices, so view all of it at once
+        triangleCount = faceCount // 3
+        face_data = np.frombuffer(reader.data, dtype="<u2", count=triangleCount * 3, offset=reader.offset).reshape(triangleCount, 3)
+        reader.skip(triangleCount * 6)
 
-        for (_) in (range(faceCount // 3)):
-            faces.append(reverse_vector(reader.vec3us()))
+        # Store the faces as one uniform (F, 3) array with their winding order reversed
+        faces = face_data[:, ::-1].astype(np.int32)
 
-        # Dynamically skip padding made of consecutive zero bytes (up to a safe limit)
-        zero_count_2 = 0
-
-        while reader.offset < reader.length:
-            if reader.ubyte() != 0:
-                reader.seek(reader.tell() - 1)  # Rewind one byte so the next read is correct
-                break
-            zero_count_2 += 1
+        # Dynamically skip padding made of consecutive zero bytes
+        zero_count_2 = reader.skip_padding()
 
         print(f"Skipped {zero_count_2} padding byte(s)")
 
@@ -149,40 +149,32 @@ class TRM():
         # VERTEX DATA
         # ------------
 
-        vertices = []
-        normals = []
-        material_index = []
-        bone_indices = []
-        bone_weights = []
-        uv = []
+        # Read every vertex at once, the vertex block is just a tightly packed array of TRM_VERTEX_DTYPE
+        vertex_data = np.frombuffer(reader.data, dtype=TRM_VERTEX_DTYPE, count=vertexCount, offset=reader.offset)
+        reader.skip(vertexCount * TRM_VERTEX_DTYPE.itemsize)
 
-        for (_) in (range(vertexCount)):
-            # -- VERTICES --------------------------
-            vertices.append(reader.vec3f())
+        # -- VERTICES --------------------------
+        vertices = np.array(vertex_data["position"], copy=True)  # A copy, so it doesn't keep the file mapped
 
+        if jit_kernels.HAS_NUMBA:
+            # -- NORMALS / UVS ---------------------
+            # Numba can convert both straight from the raw vertex bytes in a single pass
+            normals, uv = jit_kernels.decode_trm_vertex_bytes(vertex_data.view(np.uint8).reshape(vertexCount, TRM_VERTEX_DTYPE.itemsize))
+        else:
+            # Without Numba, the batch conversions do the same work with plain NumPy
             # -- NORMALS ---------------------------
-            normal = reader.vec3ub()
-            normal = convert_vertex_normal(normal[0], normal[1], normal[2])
-            normals.append(normal)
-
-            id = reader.ubyte()
-            material_index.append(id)
-
-            # -- INDICES ---------------------------
-            indices = reader.vec3ub()
-            bone_indices.append(indices)
-
-            # -- U --------------------------
-            u = reader.ubyte() / 255.0
+            normals = convert_vertex_normals_batch(vertex_data["normal"])
 
-            # -- WEIGHTS ---------------------------
-            weights = reader.vec3ub()
-            bone_weights.append(weights)
+            # -- UVS -------------------------------
+            uv = convert_uvs_batch(np.column_stack((vertex_data["u"], vertex_data["v"])))
 
-            # -- V --------------------------
-            v = 1 - reader.ubyte() / 255.0
+        # -- MATERIAL INDEX --------------------
+        # Each column is always copied out into its own contiguous uint8 array (np.ascontiguousarray would hand back a view of the file when the column is already contiguous), so nothing keeps the file mapped after parsing
+        material_index = np.array(vertex_data["material_index"], copy=True)
 
-            uv.append([u, v])
+        # -- INDICES / WEIGHTS -----------------
+        bone_indices = np.array(vertex_data["bone_indices"], copy=True)
+        bone_weights = np.array(vertex_data["bone_weights"], copy=True)
 
     # --------------------------------------------------------------------------------------------------------
 
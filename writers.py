@@ -7,14 +7,25 @@
 import os
 import bpy, struct, math
 import mathutils
+import numpy as np
+
+from .readers import STRUCT_CACHE, get_struct
+
+# -----------------------------------------------------
+
+# Anything bigger than this (1 MiB) is saved without Python's write buffer in between.
+SAVE_UNBUFFERED_SIZE = 1024 * 1024
+
+# Size of the write buffer (64 KiB) used when writing straight to a file path.
+WRITE_BUFFER_SIZE = 64 * 1024
 
 # -----------------------------------------------------
 
 # Base class for writing various data types.
 class Writer(object):
     """ Data writer class. Used for writing binary data to a file! """
-    def __init__(self, output_file: str | bytearray | None, is_little_endian: bool = True) -> None:
-        """ Construct a new Writer object. Input data, and if we want to use little endianness for our writing process. """
+    def __init__(self, output_file: str | bytearray | None, is_little_endian: bool = True, reserve: int = 0) -> None:
+        """ Construct a new Writer object. Input data, and if we want to use little endianness for our writing process. When writing to memory, `reserve` pre-sizes the buffer to that many bytes so it doesn't keep growing while writing. Given a file path, the writer streams straight into that file instead. A writer given a path must be used in a `with` block (or closed with `close`), that's the only way its last buffered writes are guaranteed to reach the file. Given a bytearray, the writer appends to whatever is already in it. """
 
         # Initialize the class
         super().__init__()
@@ -24,16 +35,25 @@ class Writer(object):
         # -------------------------------
         
         # -- DATA OFFSET
-        self.offset: int = 0
-        """ Current position in writing data. """
+        self.offset: int = len(output_file) if isinstance(output_file, bytearray) else 0
+        """ Current position in writing data. A bytearray that already has data in it is appended to, so this starts at its end. """
 
         # -- FILE CONTENTS
-        self.file = bytearray([]) if output_file is None else output_file
+        if output_file is None:
+            self.file = bytearray(reserve)
+        elif isinstance(output_file, str):  # Given a path, stream everything into it through a buffered file
+            self.file = open(output_file, "wb", buffering=WRITE_BUFFER_SIZE)
+        else:
+            self.file = output_file
         """ The contents of the written file or the written file's location. """
 
         # -- BUFFER LENGTH
-        self.length: int = 0
-        """ Length of the current buffer. """
+        self.length: int = len(self.file) if isinstance(output_file, bytearray) else 0
+        """ Length of the current buffer. For a reserved buffer this is how much of it has actually been written, not its size. When writing to a file, this is how much of the file has been written. """
+
+        # -- BUFFER CAPACITY
+        self.capacity: int = len(self.file) if isinstance(self.file, bytearray) else 0
+        """ How big the in-memory buffer is, reserved space included. Kept up to date on every write so it never has to ask the buffer. """
 
         # -- IS LITTLE ENDIAN
         self.is_LE: bool = is_little_endian
@@ -43,8 +63,26 @@ class Writer(object):
         self.raw = isinstance(self.file, bytearray) or self.file is None
         """ Are we writing to a raw array of bytes? """
 
+        # -- EMIT FUNCTION
+        self.emit_func = type(self).emit_bytearray if self.raw else type(self).emit_file
+        """ Writes raw bytes to wherever this writer is writing to, called as `emit_func(self, data)`. The destination never changes, so it's picked once here instead of on every write. It's kept unbound, a bound method would point back at the writer and keep it alive until the garbage collector found the cycle. """
+
+        # -- STRUCT CACHE
+        self.structs: dict[str, struct.Struct] = STRUCT_CACHE[is_little_endian]
+        """ The struct cache for this writer's endianness, shared with `Reader` so every format string is only ever parsed once. """
+
     # -------------------------------
 
+    # Lets the writer be used in a with block.
+    def __enter__(self) -> "Writer":
+        """ Use the writer in a `with` block, so a file it opened is always closed afterwards. """
+        return self
+
+    # Closes the file at the end of a with block.
+    def __exit__(self, *exc_info) -> None:
+        """ Closes the file at the end of the `with` block, even if something went wrong in it. """
+        self.close()
+
     # Closes the file.
     def close(self):
         """ Closes the file. """
@@ -54,75 +92,107 @@ class Writer(object):
 
     # Save the file to the given location.
     def save(self, file_path: str) -> None:
-        """ Save the data from this object to a file. """
+        """ Save the data from this object to a file. Only for in-memory writers, a writer given a path is already writing into its own file. """
+        # File writers have already written everything where it's going, quietly doing nothing would lose whatever the caller meant to save
+        if not self.raw:
+            raise ValueError("This writer is writing straight into a file, use close() instead of save()")
+
         # Is the file data even valid?
         if self.file:
 
             # If the folder that the file path given didn't exist then let's make it ourselves
             folder_dir = os.path.dirname(file_path)
-            if not os.path.exists(folder_dir):
-                os.makedirs(folder_dir)
+            if folder_dir:
+                os.makedirs(folder_dir, exist_ok=True)
 
             # In binary write mode, write our object's data to the file!
-            with open(file_path, "wb") as bin_file:
-                bin_file.write(self.file)
+            # Big buffers skip Python's write buffer entirely and go out as one write straight from the bytearray
+            buffering = 0 if self.length > SAVE_UNBUFFERED_SIZE else -1
+            with open(file_path, "wb", buffering=buffering) as bin_file:
+                data = memoryview(self.file)[:self.length]  # Leave out any reserved space that was never written
+                while data:  # An unbuffered write is allowed to write less than it was given
+                    data = data[bin_file.write(data):]
 
     # -------------------------------
 
     # Write a value to the file with a format string and a value.
     def write(self, fmt, *args):
         """ Write a value to the file with a format string and a value. """
-        # Packed value based on format string
-        packed_val = struct.pack(("" if self.is_LE else ">") + fmt, *args)
-
-        # Write to raw byte array
-        if isinstance(self.file, bytearray):  # When we're writing to a bytearray
-            self.file.extend(packed_val)
-
-        elif self.raw:  # If we're writing to a raw array or bytearray (in-memory data)
-            if self.offset == len(self.file):
-                self.file.extend(packed_val)  # Append if we're at the end
-            else:
-                # Write data at the current offset
-                for index, byte in enumerate(packed_val):
-                    self.file[self.offset + index] = byte
-
-        else:  # Write directly to a file
-            self.file.write(packed_val)
-
-        # Move offset forward by the size of the packed value
-        self.offset += struct.calcsize(fmt)
-
-        # Update the length
-        if isinstance(self.file, bytearray):
-            self.length = len(self.file)
-        else:
-            self.length = self.offset  # For file, length is tracked by the offset
-        
+        # Packed value based on format string, using the cached struct for it
+        packed_val = (self.structs.get(fmt) or get_struct(self.is_LE, fmt)).pack(*args)
+
+        self.emit_func(self, packed_val)
         return packed_val  # Ensure this returns the packed value
 
+    # Write raw bytes to the file.
+    def write_bytes(self, data: bytes) -> bytes:
+        """ Write raw bytes to the file as they are, and advance the position forward by the number of bytes written. """
+        self.emit_func(self, data)
+        return data
+
+    # Write raw bytes into the in-memory buffer.
+    def emit_bytearray(self, data: bytes) -> None:
+        """ Write raw bytes into the in-memory buffer at the current offset. Picked as `emit_func` for in-memory writers. """
+        offset = self.offset
+        end = offset + len(data)
+
+        if offset >= self.capacity:
+            # Seeking past the end leaves a gap, fill it with zeros the same way a real file would
+            if offset > self.capacity:
+                self.file.extend(bytes(offset - self.capacity))
+
+            self.file.extend(data)  # Append if we're at the end
+            self.capacity = end
+        else:
+            # Overwrite the data (or fill the reserved space) at the current offset in one slice assignment
+            self.file[offset:end] = data
+            if end > self.capacity:  # Overwriting past the end grows the buffer too
+                self.capacity = end
+
+        # Move offset forward by the size of the data, which is just its length so the format never has to be parsed again
+        self.offset = end
+        if end > self.length:  # Writing inside the buffer (or its reserved space) doesn't make it any longer
+            self.length = end
+
+    # Write raw bytes directly to the file.
+    def emit_file(self, data: bytes) -> None:
+        """ Write raw bytes directly to the open file. Picked as `emit_func` for file writers. """
+        self.file.write(data)
+
+        # Keep the offset and length in step with the file, so they read the same as they do for in-memory writers
+        end = self.offset + len(data)
+        self.offset = end
+        if end > self.length:
+            self.length = end
+
+    # Write a whole array of values as one block.
+    def write_array(self, values, dtype: str) -> bytes:
+        """ Write a whole array (or any sequence) of values as one block of the given NumPy type, like `"f4"` or `"u2"`. Advances the position forward by the size of the block. """
+        data = np.ascontiguousarray(values, dtype=("<" if self.is_LE else ">") + dtype).tobytes()
+        return self.write_bytes(data)
+
     # -------------------------------
 
     # Where are we in writing?
     def tell(self) -> int:
         """ Where are we currently in writing? """
-        return self.offset if self.raw else self.file.tell()
+        return self.offset
     
     # Move to a specific location.
     def seek(self, position: int) -> None:
         """ Move the write cursor to a specific location. """
-        if (self.raw):
-            self.offset = position
-        else:
+        if not self.raw:
             self.file.seek(position)
+        self.offset = position
 
     # -------------------------------
 
     # Write an ASCII string.
     def ascii_string(self, text: str) -> None:
         """ Write an ASCII-based text string, and move the position forward by the number of characters in the string. """
+        # The encoded bytes already are the string, so write them as they are instead of packing them through a new "Ns" format for every length
         encoded = text.encode('ascii')
-        self.write(f"{len(encoded)}s", encoded)
+        self.write_bytes(encoded)
 
     # Write a string with its length first, then the string afterwards.
     def num_string(self, text: str) -> None:
@@ -224,7 +294,7 @@ class Writer(object):
         """ Write three signed 8 bit numbers, and return them as a 4-point vector as a tuple. Advances the position forward by 3 bytes. """
         return self.write("3b", *value)
     
-    def vec3sb(self, value: tuple[int, int, int]) -> tuple[int, int, int]:
+    def vec3ub(self, value: tuple[int, int, int]) -> tuple[int, int, int]:
         """ Write three unsigned 8 bit numbers, and return them as a 4-point vector as a tuple. Advances the position forward by 3 bytes. """
         return self.write("3B", *value)
     
@@ -252,4 +322,18 @@ class Writer(object):
         """ Write three unsigned 16 bit numbers, and return them as a 3-point vector as a tuple. Advances the position forward by 6 bytes. """
         return self.write("3H", *value)
     
-    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
\ No newline at end of file
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    # -------------------------------
+    # B U L K   V E C T O R S
+    # -------------------------------
+
+    def vec3f_bulk(self, values) -> bytes:
+        """ Write a whole (N, 3) array of 32 bit floating point vectors in one go. Advances the position forward by 12 bytes per vector. """
+        return self.write_array(values, "f4")
+
+    def vec3us_bulk(self, values) -> bytes:
+        """ Write a whole (N, 3) array of unsigned 16 bit vectors in one go. Advances the position forward by 6 bytes per vector. """
+        return self.write_array(values, "u2")
+    
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -